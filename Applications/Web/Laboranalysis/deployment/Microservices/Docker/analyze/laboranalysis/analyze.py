@@ -12,107 +12,133 @@
 #  This is CONTAINER version, intended for deploying to DOCKER environment!   #
 ###############################################################################
 
-# MongoDB connection stuff:
-from pymongo import MongoClient
+# Shared MongoDB clients:
+from mongoclients import MongoClients
 # Our send mail class:
 from mailsender import MailSender
+# Concurrent orders processing:
+from orderdispatcher import OrderDispatcher
+# Orders waiting stuff:
+from orderqueue import OrderQueue
+# Stored reports reuse:
+from reportcache import ReportCache
 # Application delay to become idle
 from time import sleep
+# Amount of processors for parallel analysis
+from os import cpu_count
 # Our credentials:
-from credentials import mongo, mail_creds
+from credentials import mongo, mail_creds, store_path
+
+# Shared MongoDB client of this process
+mongodb = MongoClients.get(mongo)
+# Orders queue, this service claims orders with 'analyze' status
+queue = OrderQueue(mongodb.hh_orders['queue'], 'analyze')
+# Reports cache in 'reports' collection of 'hh_orders' database
+cache = ReportCache(mongodb.hh_orders['reports'], store_path)
 
 # Email message subjects
 problem = 'Analyze application ran into an issue'
 success = 'Analyze application completes successfully'
 
-# This function tries to get an orders from MongoDB,
-# and starts data analysis process if any exists.
-def get_orders_from_mongo():
-    # Instantiate MongoDB connection context
-    with MongoClient(mongo) as mongodb:
-        # Connection to 'analyze' collection of 'hh_orders' database
-        collection = mongodb.hh_orders['analyze']
-        # Search for orders
-        orders = list(collection.find({}))
-        # If any exists
-        if orders:
-            for order in orders:
-                if 'occupation' in order.keys():
-                    # If it's vacancy order
-                    start_vacancies_analyze(order)
-                    # If it's resume order
-                if 'criteria' in order.keys():
-                        start_resumes_analyze(order)
+# Amount of concurrently analyzed occupations (criteria),
+# container processors are shared between them
+workers = 2
+
+# This function starts data analysis process for given orders
+def process_orders(orders):
+    # If any exists
+    if orders:
+        # Jobs are not waited for, free workers take next orders
+        dispatcher.submit(orders)
 
 # This function changes an analyze order status from staging to complete,
-# by moving an order document from 'analyze' collection to 'notify' collection
-def change_order_status(order):
-    # Instantiate MongoDB connection context
-    with MongoClient(mongo) as mongodb:
-        # Connection to 'notify' collection of 'hh_orders' database
-        collection = mongodb.hh_orders['notify']
-        # Put completed order
-        collection.insert_one(order)
-        # Connection to 'analyze' collection of 'hh_orders' database
-        collection = mongodb.hh_orders['analyze']
-        # Drop completed order
-        collection.delete_one(order)  
+# by atomic moving of claimed order from 'analyze' status to 'notify' status,
+# path of stored report is kept in order for notify service
+def change_order_status(order, report=None):
+    queue.complete([order], 'notify', {'report': report} if report else None)
 
 # This function makes vacancies analyze process
-def start_vacancies_analyze(order):
-    # Try to make processing on geted order
+# for all orders on the same occupation
+def start_vacancies_analyze(orders):
+    # Try to make processing on geted orders
     try:
         # Import our vacancy processing class
         from vacancyhandler import VacancyHandler
-        vacancies = VacancyHandler(order.get('occupation'))
-        vacancies.restore_vacancies_from_mongo()
-        vacancies.analyze()
-        vacancies.store_results_to_xlsx()
-        change_order_status(order)
+        vacancies = VacancyHandler(orders[0].get('occupation'))
+        key = vacancies.report_key()
+        snapshot = cache.snapshot(key)
+        # Report of the same harvested vacancies is reused
+        report = cache.report(key)
+        if not report:
+            # Analyze stored vacancies in single pass while streaming them,
+            # vacancies chunks are parsed on container processors
+            # shared by concurrently analyzed occupations
+            vacancies.analyze_stream(vacancies.iterate_vacancies_from_mongo(),
+                                     workers=max(cpu_count() // workers, 1))
+            vacancies.store_results_to_xlsx()
+            # Parquet, CSV and JSON exports of the same results
+            vacancies.export_results()
+            report = vacancies.report
+            cache.put(key, snapshot, report)
+        for order in orders:
+            change_order_status(order, report)
     # If run into an issue, notificates application admin
     except:
+        # Claim them again later
+        queue.release(orders)
         mail = MailSender( [mail_creds['admin']], 
                             problem,
-                            str(order) )
+                            str(orders) )
         mail.send_email()
     # If completes successfully, notificates application admin
     mail = MailSender( [mail_creds['admin']],
                         success, 
-                        order.get('occupation') )
+                        orders[0].get('occupation') )
     mail.send_email()
 
 # This function makes resume analyze process
-def start_resumes_analyze(order):
-    # Try to make processing on geted order
+# for all orders on the same criteria
+def start_resumes_analyze(orders):
+    # Try to make processing on geted orders
     try:
         # Import our vacancy processing class
         from resumehandler import ResumeHandler
-        resumes = ResumeHandler(order.get('criteria'))
+        resumes = ResumeHandler(orders[0].get('criteria'))
         resumes.restore_resumes_from_mongo()
         resumes.analyze()
         resumes.store_results_to_xlsx()
-        change_order_status(order)
+        for order in orders:
+            change_order_status(order)
     # If run into an issue, notificates application admin
     except:
+        # Claim them again later
+        queue.release(orders)
         mail = MailSender( [mail_creds['admin']], 
                             problem, 
-                            str(order) )
+                            str(orders) )
         mail.send_email()        
     # If completes successfully, notificates application admin
     mail = MailSender( [mail_creds['admin']],
                         success, 
-                        order.get('criteria') )
+                        orders[0].get('criteria') )
     mail.send_email()
 
 
+# Orders on the same occupation (criteria) are analyzed once
+# by persistent pool of 'workers'
+dispatcher = OrderDispatcher({'occupation': start_vacancies_analyze,
+                              'criteria': start_resumes_analyze},
+                             workers)
+
+
 # Checks importing issue
 if __name__ == "__main__":
-    # Endless loop
-    while True:
-        # Buffer start interval
-        sleep(10)
-        # Checks for new orders
-        get_orders_from_mongo()
-        # Go to bed for 1 hour
-        sleep(3600)
+    # Buffer start interval
+    sleep(10)
+    # Orders left in former 'analyze' collection are moved to the queue
+    queue.migrate(mongodb.hh_orders['analyze'])
+    # Endless loop, wakes up as soon as new orders are put
+    # and claims one job as soon as a worker is free
+    for orders in queue.batches(ready=dispatcher.wait_worker):
+        process_orders(orders)
     
\ No newline at end of file
@@ -0,0 +1,128 @@
+
+# Delay function:
+import time
+# Backoff jitter:
+import random
+# HTTP requests:
+import requests
+
+# HTTP-date parsing for 'Retry-After' header:
+from email.utils import parsedate_to_datetime
+# Connection pool stuff:
+from requests.adapters import HTTPAdapter
+
+
+class HttpClient:
+    '''
+    -------------------------------------------------------------
+    Class is designed to make HTTP requests to HeadHunter API
+      through pooled keep-alive connections with timeouts,
+      retries, jittered exponential backoff and 'Retry-After'.
+      Every attempt (retries too) could be held by requests
+      budget 'throttle' callable
+    -------------------------------------------------------------
+    Public methods:
+        get(url, params)
+        close()
+    -------------------------------------------------------------
+    '''
+
+    # Response statuses which are worth another attempt
+    retry_statuses = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self,
+        # Amount of kept-alive connections per host
+        pool_size=10,
+        # Connect and read timeouts in seconds
+        timeout=(5, 30),
+        # Amount of additional attempts after failed one
+        retries=5,
+        # First backoff delay in seconds, doubles with every attempt
+        backoff=1,
+        # Backoff delay and 'Retry-After' limit in seconds
+        max_backoff=120):
+
+        # Connect and read timeouts in seconds
+        self.timeout = timeout
+        # Amount of additional attempts after failed one
+        self.retries = retries
+        # First backoff delay in seconds
+        self.backoff = backoff
+        # Backoff delay and 'Retry-After' limit in seconds
+        self.max_backoff = max_backoff
+
+        # Keep-alive session with connections pool shared by all threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    #--------------------------------------------------------------------------
+    # Full jitter exponential backoff delay for given attempt
+    #--------------------------------------------------------------------------
+    def _backoff_delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff,
+                                     self.backoff * 2 ** attempt))
+
+    #--------------------------------------------------------------------------
+    # Delay requested by server in 'Retry-After' header (seconds or HTTP-date)
+    #--------------------------------------------------------------------------
+    def _retry_after_delay(self, response):
+        retry_after = response.headers.get('Retry-After')
+        if not retry_after:
+            return None
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(retry_after).timestamp()
+                         - time.time())
+            except (TypeError, ValueError):
+                return None
+        return min(max(delay, 0), self.max_backoff)
+
+    #--------------------------------------------------------------------------
+    def get(self, url, params=None, throttle=None):
+        '''Make GET request, retry connection errors, timeouts,
+        429 and 5xx responses, raise HTTPError on final failure.
+        'throttle' is called before every attempt and holds it
+        until its turn in requests budget comes
+        '''
+        attempt = 0
+        while True:
+            if throttle is not None:
+                throttle()
+            try:
+                response = self.session.get(url, params=params,
+                                            timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                # Out of attempts
+                if attempt >= self.retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+            else:
+                # Success, client error or out of attempts
+                if (response.status_code not in HttpClient.retry_statuses
+                        or attempt >= self.retries):
+                    response.raise_for_status()
+                    return response
+                delay = self._retry_after_delay(response)
+                if delay is None:
+                    delay = self._backoff_delay(attempt)
+            attempt += 1
+            time.sleep(delay)
+
+    #--------------------------------------------------------------------------
+    def close(self):
+        '''Close all pooled connections
+        '''
+        self.session.close()
+
+
+# Checks importing issue
+if __name__ == "__main__":
+    # Make test request
+    client = HttpClient()
+    print(client.get('https://api.hh.ru/vacancies',
+                     params={'text': 'Python', 'per_page': 1}).json())
@@ -0,0 +1,313 @@
+
+# Delay function:
+import time
+# Unique claim tokens:
+import uuid
+# Lease renewal in background:
+import threading
+
+# Lease time stamps:
+from datetime import datetime, timedelta
+
+# MongoDB stuff:
+from pymongo import ASCENDING, ReturnDocument
+# MongoDB errors:
+from pymongo.errors import PyMongoError
+
+
+class OrderQueue:
+    '''
+    -------------------------------------------------------------
+    Class is designed to take orders of one processing stage
+      from common orders queue collection, where every order has
+      'status' field with its stage name.
+    Order is taken by atomic claim with lease: claim token and
+      claim time are set in single update, lease is renewed in
+      background while order is processed and expires if service
+      crashes, so order is claimed again by another replica.
+    Pending orders on the same subject (occupation, criteria)
+      are claimed together as one job.
+    Stage is completed by single status update of claimed order.
+    Queue waits for orders by MongoDB change stream, without
+      change streams (standalone MongoDB server) collection is
+      polled with adaptive backoff. Either way it wakes up when
+      the nearest lease of another claim expires
+    -------------------------------------------------------------
+    Public methods:
+        ensure_indexes()
+        put(order)
+        migrate(collection)
+        claim(limit)
+        complete(orders, status, fields)
+        release(orders, delay)
+        batches(limit, ready)
+        close()
+    -------------------------------------------------------------
+    '''
+
+    # Order subject fields, orders on the same subject are merged
+    subjects = ('occupation', 'criteria')
+
+    # Collections with already ensured indexes in this process
+    indexed = set()
+
+    def __init__(self, collection, status,
+        # Claim lease in seconds, it's renewed while order is processed
+        lease=600,
+        # Delay in seconds before released (failed) orders are claimed again
+        retry_delay=3600,
+        # First polling delay in seconds, doubles while there are no orders
+        min_delay=1,
+        # Polling delay limit and change stream idle recheck in seconds
+        max_delay=30):
+
+        # MongoDB orders queue collection
+        self.collection = collection
+        # Stage name, orders with this status are claimed
+        self.status = status
+        # Claim lease
+        self.lease = timedelta(seconds=lease)
+        # Delay before released orders are claimed again
+        self.retry_delay = timedelta(seconds=retry_delay)
+        # First polling delay in seconds
+        self.min_delay = min_delay
+        # Polling delay limit in seconds
+        self.max_delay = max_delay
+
+        # Collection change stream, it's opened on first wait
+        self.stream = None
+        # Tokens of claims held by this queue
+        self.claims = set()
+        self.lock = threading.Lock()
+        # Lease renewal thread, it's started on first claim
+        self.renewer = None
+
+    def ensure_indexes(self):
+        '''Create indexes on status and claim time (once per process)
+        '''
+        name = self.collection.full_name
+        if name in OrderQueue.indexed:
+            return
+        self.collection.create_index([('status', ASCENDING),
+                                      ('claimed_at', ASCENDING)])
+        self.collection.create_index('claim', sparse=True)
+        OrderQueue.indexed.add(name)
+
+    def put(self, order):
+        '''Put order to the queue with this queue stage status
+        '''
+        self.ensure_indexes()
+        order = dict(order, status=self.status)
+        self.collection.insert_one(order)
+        return order
+
+    def migrate(self, collection):
+        '''Move orders left in former stage 'collection' (orders were
+        kept in collection per stage) to the queue with this queue stage
+        status, returns amount of moved orders. Order is put before it's
+        dropped and isn't put twice, so replicas could migrate together
+        and interrupted migration is completed on the next start
+        '''
+        self.ensure_indexes()
+        moved = 0
+        for order in collection.find({}):
+            self.collection.update_one(
+                {'_id': order.get('_id')},
+                {'$setOnInsert': dict(order, status=self.status)},
+                upsert=True)
+            moved += collection.delete_one({'_id': order.get('_id')}).deleted_count
+        return moved
+
+    #--------------------------------------------------------------------------
+    # Query of orders with this stage status which are free to be claimed:
+    # never claimed, released or with expired lease
+    #--------------------------------------------------------------------------
+    def _claimable(self, now):
+        return {'status': self.status,
+                '$or': [{'claimed_at': None},
+                        {'claimed_at': {'$lt': now - self.lease}}]}
+
+    #--------------------------------------------------------------------------
+    # Renew leases of held claims while the process lives
+    #--------------------------------------------------------------------------
+    def _leases_renewer(self):
+        while True:
+            time.sleep(self.lease.total_seconds() / 3)
+            with self.lock:
+                claims = list(self.claims)
+            if not claims:
+                continue
+            try:
+                self.collection.update_many(
+                    {'claim': {'$in': claims}},
+                    {'$set': {'claimed_at': datetime.utcnow()}})
+            except PyMongoError:
+                # Lease is renewed next time or expires
+                pass
+
+    def claim(self, limit=1):
+        '''Atomically claim up to 'limit' jobs, job is a list of
+        orders on the same subject, returns all claimed orders
+        '''
+        self.ensure_indexes()
+        orders = []
+        for job in range(int(limit)):
+            token = uuid.uuid4().hex
+            now = datetime.utcnow()
+            claim = {'$set': {'claim': token, 'claimed_at': now}}
+            # Claim the oldest free order
+            order = self.collection.find_one_and_update(
+                self._claimable(now), claim,
+                sort=[('claimed_at', ASCENDING), ('_id', ASCENDING)],
+                return_document=ReturnDocument.AFTER)
+            if order is None:
+                break
+            # Claim other free orders on the same subject
+            for field in OrderQueue.subjects:
+                if field in order.keys():
+                    self.collection.update_many(
+                        dict(self._claimable(now), **{field: order.get(field)}),
+                        claim)
+                    break
+            orders += list(self.collection.find({'claim': token}))
+            with self.lock:
+                self.claims.add(token)
+
+        if orders and self.renewer is None:
+            self.renewer = threading.Thread(target=self._leases_renewer,
+                                            daemon=True)
+            self.renewer.start()
+        return orders
+
+    #--------------------------------------------------------------------------
+    # Forget claims which don't hold any order anymore
+    #--------------------------------------------------------------------------
+    def _claims_cleaner(self, orders):
+        with self.lock:
+            for token in {order.get('claim') for order in orders}:
+                if not self.collection.count_documents({'claim': token},
+                                                       limit=1):
+                    self.claims.discard(token)
+
+    def complete(self, orders, status, fields=None):
+        '''Move claimed orders to the next stage 'status' in single update,
+        'fields' (e.g. {'report': path}) are set to orders in the same update,
+        orders claimed by somebody else meanwhile are not touched,
+        returns amount of moved orders
+        '''
+        moved = 0
+        for order in orders:
+            result = self.collection.update_one(
+                {'_id': order.get('_id'),
+                 'status': self.status,
+                 'claim': order.get('claim')},
+                {'$set': dict(fields or {}, status=status),
+                 '$unset': {'claim': '', 'claimed_at': ''}})
+            moved += result.modified_count
+        self._claims_cleaner(orders)
+        return moved
+
+    def release(self, orders, delay=None):
+        '''Release claimed (failed) orders, they are claimed again
+        in 'delay' seconds ('retry_delay' default)
+        '''
+        delay = self.retry_delay if delay is None else timedelta(seconds=delay)
+        for order in orders:
+            self.collection.update_one(
+                {'_id': order.get('_id'), 'claim': order.get('claim')},
+                # Lease expires in 'delay'
+                {'$set': {'claimed_at': datetime.utcnow() - self.lease + delay},
+                 '$unset': {'claim': ''}})
+        self._claims_cleaner(orders)
+
+    #--------------------------------------------------------------------------
+    # Change stream events which could bring claimable orders: orders put
+    # or moved to this stage and released orders (their leases are set to
+    # expire). Claims and lease renewals don't wake the queue
+    #--------------------------------------------------------------------------
+    def _events(self):
+        return [{'$match': {'$or': [
+            {'operationType': {'$in': ['insert', 'replace']},
+             'fullDocument.status': self.status},
+            {'operationType': 'update',
+             'updateDescription.updatedFields.status': self.status},
+            {'operationType': 'update',
+             'updateDescription.removedFields': 'claim',
+             'updateDescription.updatedFields.claimed_at': {'$exists': True}},
+        ]}}]
+
+    #--------------------------------------------------------------------------
+    # Open collection change stream, None if it's not supported
+    #--------------------------------------------------------------------------
+    def _watch(self):
+        try:
+            return self.collection.watch(self._events(),
+                                         max_await_time_ms=1000)
+        except PyMongoError:
+            return None
+
+    #--------------------------------------------------------------------------
+    # Seconds until the nearest lease of orders with this stage status
+    # claimed by others (or released) expires, None without such leases
+    #--------------------------------------------------------------------------
+    def _expiry_delay(self):
+        now = datetime.utcnow()
+        with self.lock:
+            claims = list(self.claims)
+        order = self.collection.find_one(
+            {'status': self.status,
+             'claimed_at': {'$gte': now - self.lease},
+             'claim': {'$nin': claims}},
+            {'claimed_at': 1},
+            sort=[('claimed_at', ASCENDING)])
+        if order is None:
+            return None
+        return max((order['claimed_at'] + self.lease - now).total_seconds(), 0)
+
+    #--------------------------------------------------------------------------
+    # Wait for collection change event or 'delay' seconds without stream,
+    # expiring lease ends waiting
+    #--------------------------------------------------------------------------
+    def _wait(self, delay):
+        expiry = self._expiry_delay()
+        if self.stream is None:
+            time.sleep(delay if expiry is None else min(delay, expiry))
+            return
+        deadline = time.monotonic() + (self.max_delay if expiry is None
+                                       else min(self.max_delay, expiry))
+        try:
+            while time.monotonic() < deadline:
+                if self.stream.try_next() is not None:
+                    return
+        except PyMongoError:
+            # Stream is broken, fall back to polling
+            self.close()
+
+    def batches(self, limit=1, ready=None):
+        '''Generate claimed orders of up to 'limit' jobs
+        as soon as they appear. 'ready' is called before every
+        claim and holds it until orders could be processed
+        (e.g. until a worker is free)
+        '''
+        # Change stream is opened before first claim,
+        # so orders put meanwhile are not missed
+        self.stream = self._watch()
+        delay = self.min_delay
+        while True:
+            if ready is not None:
+                ready()
+            orders = self.claim(limit)
+            if orders:
+                delay = self.min_delay
+                yield orders
+                continue
+
+            self._wait(delay)
+            delay = min(delay * 2, self.max_delay)
+
+    def close(self):
+        '''Close change stream
+        '''
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
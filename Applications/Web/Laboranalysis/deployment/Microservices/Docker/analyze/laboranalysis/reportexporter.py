@@ -0,0 +1,170 @@
+
+# OS API functions:
+import os
+# Compressed CSV writing:
+import csv
+import gzip
+# JSON summary writing:
+import json
+# Numbers check:
+import numbers
+# Rows chunking:
+from itertools import islice
+
+# Columnar Parquet writing is optional
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class ReportExporter:
+    '''
+    -------------------------------------------------------------
+    Class is designed to export analysis results to formats
+      other than xlsx by format backends. Every backend gets
+      the same result tables and summary, built-in ones are:
+        'parquet' - columnar Parquet (requires pyarrow,
+                    the format is skipped without it)
+        'csv'     - gzip'd CSV
+        'json'    - compact JSON summary
+    Tables are exported in long form, one row per table row:
+      (table, item, number, text), where item is first cell
+      of table row, number and text are its second cell
+    -------------------------------------------------------------
+    Public methods:
+        formats()
+        rows(tables)
+        export(path, tables, summary, formats)
+    -------------------------------------------------------------
+    '''
+
+    # Long form columns
+    columns = ('table', 'item', 'number', 'text')
+
+    # {format : file extension}
+    extensions = {
+        'parquet': '.parquet',
+        'csv': '.csv.gz',
+        'json': '.json',
+    }
+
+    # Amount of rows in one Parquet row group
+    chunk_size = 10000
+
+    def __init__(self, backends=None):
+        # {format : (file extension, writer(path, tables, summary))},
+        # additional backends could be plugged in
+        self.backends = {
+            'parquet': (ReportExporter.extensions['parquet'],
+                        self._parquet_writer),
+            'csv': (ReportExporter.extensions['csv'], self._csv_writer),
+            'json': (ReportExporter.extensions['json'], self._json_writer),
+        }
+        self.backends.update(backends or {})
+
+    def formats(self):
+        '''Formats available for export
+        '''
+        return [format
+            for format in self.backends
+                if format != 'parquet' or pyarrow is not None]
+
+    def rows(self, tables):
+        '''Generate long form rows of 'tables' {table : rows}
+        '''
+        for table, rows in tables.items():
+            for row in rows or ():
+                if isinstance(row, (str, bytes)) or not hasattr(row, '__iter__'):
+                    row = (row,)
+                row = list(row)
+                item = row[0] if row else None
+                value = row[1] if len(row) > 1 else None
+                # Booleans are not exported as numbers
+                if (isinstance(value, numbers.Number)
+                        and not isinstance(value, bool)):
+                    yield (table, self._text(item), float(value), None)
+                else:
+                    yield (table, self._text(item), None, self._text(value))
+
+    #--------------------------------------------------------------------------
+    # Cell as text, empty cell is None
+    #--------------------------------------------------------------------------
+    @staticmethod
+    def _text(cell):
+        return None if cell is None else str(cell)
+
+    #--------------------------------------------------------------------------
+    # Columnar Parquet backend, rows are written by row groups
+    #--------------------------------------------------------------------------
+    def _parquet_writer(self, path, tables, summary):
+        schema = pyarrow.schema([('table', pyarrow.string()),
+                                 ('item', pyarrow.string()),
+                                 ('number', pyarrow.float64()),
+                                 ('text', pyarrow.string())])
+        rows = self.rows(tables)
+        with pyarrow.parquet.ParquetWriter(path, schema,
+                                           compression='snappy') as writer:
+            while True:
+                chunk = list(islice(rows, ReportExporter.chunk_size))
+                if not chunk:
+                    break
+                writer.write_table(pyarrow.Table.from_arrays(
+                    [pyarrow.array(column, type=field.type)
+                        for column, field in zip(zip(*chunk), schema)],
+                    schema=schema))
+
+    #--------------------------------------------------------------------------
+    # Gzip'd CSV backend
+    #--------------------------------------------------------------------------
+    def _csv_writer(self, path, tables, summary):
+        with gzip.open(path, 'wt', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(ReportExporter.columns)
+            writer.writerows(self.rows(tables))
+
+    #--------------------------------------------------------------------------
+    # Compact JSON summary backend
+    #--------------------------------------------------------------------------
+    def _json_writer(self, path, tables, summary):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(summary, file, ensure_ascii=False,
+                      separators=(',', ':'), default=self._json_value)
+
+    #--------------------------------------------------------------------------
+    # JSON value of numpy numbers and other objects
+    #--------------------------------------------------------------------------
+    @staticmethod
+    def _json_value(value):
+        if hasattr(value, 'item'):
+            return value.item()
+        return str(value)
+
+    def export(self, path, tables, summary, formats=None):
+        '''Write 'tables' {table : rows} and 'summary' dict
+        to 'path' + format extension files of 'formats'
+        (all available default), every file is written to
+        hidden file first and then atomically replaced,
+        returns {format : file path}
+        '''
+        directory, name = os.path.split(path)
+        exported = {}
+        for format in formats or self.formats():
+            if format not in self.formats():
+                continue
+            extension, writer = self.backends[format]
+            file_path = path + extension
+            storing_path = os.path.join(directory, f'.{name}{extension}')
+            writer(storing_path, tables, summary)
+            os.replace(storing_path, file_path)
+            exported[format] = file_path
+        return exported
+
+
+# Checks importing issue
+if __name__ == "__main__":
+    # Export test tables to current directory
+    exporter = ReportExporter()
+    print(exporter.export('test', {'Навыки': [('python', 3), ('sql', 2)]},
+                          {'criteria': 'test'}))
@@ -0,0 +1,128 @@
+
+# Regexp stuff:
+import re
+
+
+class _CharactersTable(dict):
+    '''
+    -------------------------------------------------------------
+    Translate table of str.translate() for all unicode: every
+      character is checked by 'keep' once and its mapping is
+      cached, character is kept or replaced by 'replacement'
+    -------------------------------------------------------------
+    '''
+
+    def __init__(self, keep, replacement=None):
+        super().__init__()
+        # Check of character to keep
+        self.keep = keep
+        # Replacement of not kept characters, None drops them
+        self.replacement = replacement
+
+    def __missing__(self, code):
+        value = code if self.keep(chr(code)) else self.replacement
+        self[code] = value
+        return value
+
+    def __reduce__(self):
+        return (_CharactersTable, (self.keep, self.replacement))
+
+
+#------------------------------------------------------------------------------
+# Characters checks of translate tables
+#------------------------------------------------------------------------------
+def _is_cyrillic(char):
+    return 'А' <= char <= 'я'
+
+def _is_cyrillic_or_space(char):
+    return _is_cyrillic(char) or char.isspace()
+
+def _is_clean(char):
+    return (_is_cyrillic(char) or '0' <= char <= '9'
+            or char in '-.' or char.isspace())
+
+
+class Tokenizer:
+    '''
+    -------------------------------------------------------------
+    Class is designed to split descriptions texts into token
+      streams with patterns compiled once:
+        latin(text)    - english words (technologies names)
+        words(text)    - all words, any language and digits
+        heading(text)  - russian words of section heading
+      Cleaning is done by str.translate() tables built lazily,
+      so every character class is checked once per process.
+    Stop words are dropped from every stream and 'lemmatizer'
+      (callable of token) normalizes its tokens, both are
+      optional. Tokenizer is sent to analysis processes, so
+      'lemmatizer' should be picklable (module level function)
+    -------------------------------------------------------------
+    Public methods:
+        latin(text)
+        words(text)
+        heading(text)
+        clean(text)
+    -------------------------------------------------------------
+    '''
+
+    # Token patterns
+    latin_pattern = re.compile('[A-Za-z]+')
+    words_pattern = re.compile(r'\w+')
+
+    # Russian words, digits, dashes and dots are kept by cleaning
+    clean_table = _CharactersTable(_is_clean)
+    # Russian words are kept in headings
+    heading_table = _CharactersTable(_is_cyrillic_or_space)
+
+    def __init__(self, stopwords=None, lemmatizer=None):
+        # Tokens dropped from streams
+        self.stopwords = frozenset(stopwords or ())
+        # Token normalization
+        self.lemmatizer = lemmatizer
+
+    #--------------------------------------------------------------------------
+    # Lemmatized tokens without stop words
+    #--------------------------------------------------------------------------
+    def _filtered(self, tokens):
+        if self.lemmatizer is not None:
+            tokens = [self.lemmatizer(token)
+                for token in tokens]
+        if self.stopwords:
+            tokens = [token
+                for token in tokens
+                    if token not in self.stopwords]
+        return tokens
+
+    def latin(self, text):
+        '''English words of 'text'
+        '''
+        return self._filtered(Tokenizer.latin_pattern.findall(text))
+
+    def words(self, text):
+        '''All words of 'text'
+        '''
+        return self._filtered(Tokenizer.words_pattern.findall(text))
+
+    def heading(self, text):
+        '''Russian words of 'text' joined by single spaces
+        '''
+        return ' '.join(self._filtered(
+            text.translate(Tokenizer.heading_table).split()))
+
+    def clean(self, text):
+        '''Lowercased 'text' without trailing dots and anything
+        but russian words, digits, dashes and dots. It's text,
+        not tokens: it's split by words(), which applies hooks
+        '''
+        return (text.lower().strip().strip('.')
+                .translate(Tokenizer.clean_table))
+
+
+# Checks importing issue
+if __name__ == "__main__":
+    # Split test text
+    tokenizer = Tokenizer()
+    text = 'Опыт работы с Python, Django и PostgreSQL от 3-х лет.'
+    print(tokenizer.latin(text))
+    print(tokenizer.words(tokenizer.clean(text)))
+    print(tokenizer.heading(text))
@@ -0,0 +1,218 @@
+
+# Compact typed arrays:
+from array import array
+
+# Vectorized calculations:
+import numpy
+
+# Vacancy descriptions accumulator:
+from accumulators import DescriptionsAccumulator
+
+
+class CategoricalColumn:
+    '''
+    -------------------------------------------------------------
+    Class is designed to keep categorical values interned:
+      every unique value is stored once, rows keep its codes.
+    Codes are given in first entry order
+    -------------------------------------------------------------
+    Public methods:
+        add(value, key)
+        merge(other)
+        codes()
+        frequencies(top)
+        rows()
+    -------------------------------------------------------------
+    '''
+
+    def __init__(self):
+        # Unique values, its position is its code
+        self.values = []
+        # {value key : code}
+        self.index = {}
+        # Codes of values of all rows
+        self.rows_codes = array('i')
+
+    def __len__(self):
+        return len(self.rows_codes)
+
+    def add(self, value, key=None):
+        '''Add row value, 'key' identifies unhashable values
+        '''
+        if key is None:
+            key = value
+        code = self.index.get(key)
+        if code is None:
+            code = self.index[key] = len(self.values)
+            self.values.append(value)
+        self.rows_codes.append(code)
+
+    def merge(self, other):
+        '''Add rows of other column after own rows,
+        other column new values get codes in its first entry order
+        '''
+        # Own code of every other column code
+        recode = numpy.empty(len(other.values), dtype=numpy.intc)
+        for other_code, (key, value) in enumerate(zip(other.index,
+                                                      other.values)):
+            code = self.index.get(key)
+            if code is None:
+                code = self.index[key] = len(self.values)
+                self.values.append(value)
+            recode[other_code] = code
+        self.rows_codes.frombytes(recode[other.codes()].tobytes())
+
+    def codes(self):
+        '''Rows codes as numpy array
+        '''
+        return numpy.frombuffer(self.rows_codes, dtype=numpy.intc)
+
+    def frequencies(self, top=None):
+        '''Group rows by values and form (value, number of entries)
+        sorted by number of entries, equal counts keep first entry order
+        '''
+        counts = numpy.bincount(self.codes(), minlength=len(self.values))
+        # Stable sort keeps codes (first entry) order for equal counts
+        order = numpy.argsort(-counts, kind='stable')[:top]
+        return [(self.values[code], int(counts[code]))
+            for code in order]
+
+    def rows(self):
+        '''Values of all rows
+        '''
+        return [self.values[code] for code in self.rows_codes]
+
+
+class VacancyColumns:
+    '''
+    -------------------------------------------------------------
+    Class is designed to keep vacancies batch in compact columnar
+      form: interned categorical columns, numeric salary arrays
+      and descriptions accumulator parsing every description once.
+    Vacancies could be fed one by one, raw descriptions are not kept
+    -------------------------------------------------------------
+    Public methods:
+        append(vacancy)
+        extend(vacancies)
+        merge(other)
+        frequencies(column, top)
+        values(column)
+        rows(column)
+        salaries()
+    -------------------------------------------------------------
+    '''
+
+    # Categorical columns with vacancy values extractors,
+    # every extractor returns list of values (several for some columns)
+    categorical = {
+        'id': lambda vacancy: [vacancy.get('id')],
+        'name': lambda vacancy: [vacancy.get('name').lower()],
+        'skill': lambda vacancy: [key_skill.get('name')
+            for key_skill in vacancy.get('key_skills')],
+        'experience': lambda vacancy: [vacancy.get('experience').get('name')],
+        'profarea': lambda vacancy: [specialization['profarea_name']
+            for specialization in vacancy.get('specializations')],
+        'specialization': lambda vacancy: [specialization['name']
+            for specialization in vacancy.get('specializations')],
+        'created_at': lambda vacancy: [vacancy.get('created_at')],
+        'area': lambda vacancy: [vacancy.get('area').get('name')],
+    }
+
+    def __init__(self, html_parser='html.parser', tokenizer=None):
+        # Categorical columns
+        self.columns = {column: CategoricalColumn()
+            for column in VacancyColumns.categorical}
+        # Employers column, one employer info per employer
+        self.columns['employer'] = CategoricalColumn()
+        # Salary currencies column
+        self.columns['currency'] = CategoricalColumn()
+
+        # Salary bounds, NaN if not specified
+        self.salary_from = array('d')
+        self.salary_to = array('d')
+        # Salary gross (before taxes) flags
+        self.salary_gross = array('b')
+
+        # Vacancy descriptions parsed into accumulated words and elements
+        self.descriptions = DescriptionsAccumulator(html_parser, tokenizer)
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def append(self, vacancy):
+        '''Add vacancy to columns
+        '''
+        for column, extractor in VacancyColumns.categorical.items():
+            for value in extractor(vacancy):
+                self.columns[column].add(value)
+
+        employer = vacancy.get('employer')
+        self.columns['employer'].add(employer,
+                                     key=(employer.get('id'),
+                                          employer.get('name'),
+                                          employer.get('alternate_url')))
+
+        salary = vacancy.get('salary') or {}
+        self.columns['currency'].add(salary.get('currency'))
+        self.salary_from.append(salary.get('from') or numpy.nan)
+        self.salary_to.append(salary.get('to') or numpy.nan)
+        self.salary_gross.append(bool(salary.get('gross')))
+
+        self.descriptions.add(vacancy.get('description'))
+
+    def extend(self, vacancies):
+        '''Add all vacancies to columns
+        '''
+        for vacancy in vacancies:
+            self.append(vacancy)
+
+    def merge(self, other):
+        '''Add vacancies of other columns after own ones,
+        merging parts in vacancies order gives the same columns
+        as appending all vacancies one by one
+        '''
+        for column, values in other.columns.items():
+            self.columns[column].merge(values)
+        self.salary_from += other.salary_from
+        self.salary_to += other.salary_to
+        self.salary_gross += other.salary_gross
+        self.descriptions.merge(other.descriptions)
+
+    @classmethod
+    def from_vacancies(cls, vacancies, html_parser='html.parser',
+                       tokenizer=None):
+        '''Build columns from vacancies part (process pool worker)
+        '''
+        columns = cls(html_parser, tokenizer)
+        columns.extend(vacancies)
+        return columns
+
+    def frequencies(self, column, top=None):
+        '''Form (value, number of entries) sorted by number of entries
+        '''
+        return self.columns[column].frequencies(top)
+
+    def values(self, column):
+        '''Unique values of the column in first entry order
+        '''
+        return self.columns[column].values
+
+    def rows(self, column):
+        '''Values of the column for every row
+        '''
+        return self.columns[column].rows()
+
+    def salaries(self):
+        '''Salary arrays: regions codes, regions names, currencies,
+        gross flags, bounds 'from' and 'to' (NaN if not specified)
+        '''
+        currencies = numpy.array(self.values('currency'), dtype=object)
+        return {
+            'region': self.columns['area'].codes(),
+            'regions': self.values('area'),
+            'currency': currencies[self.columns['currency'].codes()],
+            'gross': numpy.frombuffer(self.salary_gross, dtype=numpy.int8)
+                .astype(bool),
+            'from': numpy.frombuffer(self.salary_from, dtype=numpy.float64),
+            'to': numpy.frombuffer(self.salary_to, dtype=numpy.float64),
+        }
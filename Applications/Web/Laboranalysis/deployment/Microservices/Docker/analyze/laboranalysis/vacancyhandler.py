@@ -28,14 +28,10 @@
 
 # OS API functions:
 import os
-# Regexp stuff:
-import re
 # [De]Serializing objects:
 import json
 # Delay function:
 import time
-# Excel documents processing:
-import pandas
 # Native objects store:
 import pickle
 # Code profiling:
@@ -44,20 +40,47 @@ import cProfile
 import requests
 # Create xlsx files
 import openpyxl
-# Some math:
-import statistics
 # Some data structures:
 import collections
-
-# HTML parser:
-from bs4 import BeautifulSoup
-# MongoDB connection stuff:
-from pymongo import MongoClient
+# Most frequent words selection:
+import heapq
+# Vacancy content fingerprints:
+import hashlib
+# Analysis processes start method:
+import multiprocessing
+
+# Concurrent requests and parallel analysis stuff:
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+# Vacancies chunks slicing:
+from itertools import islice
+# Vacancy publication time:
+from datetime import datetime
+
+# Shared MongoDB clients:
+from mongoclients import MongoClients
 # Preetty progressbar
 from tqdm import tqdm
 
 # Some filter stuff:
 from filtervocabulary import vocabulary
+# Single pass vocabulary criteria matching:
+from vocabularymatcher import VocabularyMatcher
+# Pooled HTTP client with retries:
+from httpclient import HttpClient
+# Requests budget shared by threads:
+from ratelimiter import RateLimiter
+# Compact columnar vacancies store:
+from vacancycolumns import VacancyColumns
+# Salary statistics calculations:
+from salaryengine import SalaryEngine
+# MongoDB vacancies storage:
+from vacancystorage import VacancyStorage
+# Stored reports reuse:
+from reportcache import ReportCache
+# Streaming xlsx reports writer:
+from reportwriter import ReportWriter
+# Parquet, CSV and JSON reports exporter:
+from reportexporter import ReportExporter
 # Our credentials:
 from credentials import mongo, store_path
 
@@ -77,8 +100,15 @@ class VacancyHandler:
         exclude_by_region(exclude_geo_area)
         include_by_region(include_geo_area)
         analyze()
+        analyze_stream(vacancies)
+        compact()
+        iterate_vacancies_from_hh()
+        iterate_vacancies_from_mongo()
+        restore_vacancies_from_mongo()
         store_vacancies_to_mongo()
         store_results_to_xlsx()
+        export_results(formats)
+        report_key()
     '''
 
 ###############################################################################
@@ -87,6 +117,64 @@ class VacancyHandler:
 
     # Base HeadHunter API-url for vacancy retrievement
     api_url = 'https://api.hh.ru/vacancies'
+
+    # Amount of concurrent full vacancies requests
+    fetch_workers = 8
+
+    # Global requests budget (requests per second) shared by all workers
+    fetch_rate = 4
+
+    # HTTP client with keep-alive connections pool shared by all instances
+    http = HttpClient(pool_size=fetch_workers)
+
+    # Requests budget shared by all retrievements of the process
+    limiter = RateLimiter(fetch_rate)
+
+    # Amount of analysis processes, 1 analyzes in current process
+    analyze_workers = 1
+
+    # Amount of vacancies analyzed by one process at a time
+    analyze_chunk = 250
+
+    # Analysis processes are not forked from multi-threaded services
+    analyze_start_method = ('forkserver'
+        if 'forkserver' in multiprocessing.get_all_start_methods()
+            else 'spawn')
+
+    # Reports directory marker touched when report is published
+    publish_marker = '.published'
+
+    # Analysis results exporter to Parquet, CSV and JSON
+    exporter = ReportExporter()
+
+    # Automaton of all vocabulary criteria, compiled once
+    matcher = VocabularyMatcher(vocabulary)
+
+    # Amount of most frequent words kept in wordbags, None keeps all
+    wordbags_top = None
+
+    # Vacancy fields used by collectors and extractors
+    restore_projection = {
+        '_id': 0,
+        'id': 1,
+        'name': 1,
+        'key_skills.name': 1,
+        'experience.name': 1,
+        'specializations.name': 1,
+        'specializations.profarea_name': 1,
+        'created_at': 1,
+        'published_at': 1,
+        'area.name': 1,
+        'employer.id': 1,
+        'employer.name': 1,
+        'employer.url': 1,
+        'employer.alternate_url': 1,
+        'salary': 1,
+        'description': 1,
+    }
+
+    # Whole vacancies are restored to be stored back, MongoDB '_id' is not
+    whole_projection = {'_id': 0}
     
     #--------------------------------------------------------------------------
     # Class instance constructor
@@ -99,7 +187,13 @@ class VacancyHandler:
         search_field='name',
         # Region restriction for vacancy search, for example:
         # Russia(113), Novosibirsk(1202), Moscow(1) region
-        geo_areas=['1202',]):
+        geo_areas=['1202',],
+        # BeautifulSoup parser backend for vacancy descriptions,
+        # 'lxml' is faster than default 'html.parser'
+        html_parser='html.parser',
+        # Vacancy descriptions tokenizer, e.g. Tokenizer(stopwords,
+        # lemmatizer), default one has no stop words and lemmatization
+        tokenizer=None):
         
         # Text to be searched in vacancy to establish a match condition
         # Occupation name, in main
@@ -123,6 +217,19 @@ class VacancyHandler:
         # Full vacancies batch itself
         self.vacancies = []
 
+        # BeautifulSoup parser backend for vacancy descriptions
+        self.html_parser = html_parser
+
+        # Vacancy descriptions tokenizer, None is shared default one
+        self.tokenizer = tokenizer
+
+        # Compact columnar representation of vacancies batch
+        self.columns = None
+
+        # Vacancies are restored with projection, they lack fields
+        # and must not replace stored ones
+        self.projected = False
+
         # Names of all vacancies in batch
         self.vacancy_names = None
 
@@ -140,10 +247,15 @@ class VacancyHandler:
         # Child elements from all subject headings (html 'strongs')
         self.description_elements_all = None
 
-        # Child elements from top 10 subject headings (html 'strongs')
+        # {vocabulary criteria : indices of description_elements_all
+        # containing it}
+        self.vocabulary_tags = None
+
+        # Unique child elements from top 10 subject headings (html 'strongs')
+        # in first entry order
         self.description_elements = None
 
-        # Child elements from description_sections_top subject headings (html 'strongs')
+        # Unique child elements from description_sections_top subject headings (html 'strongs')
         self.description_elements_top = None
 
         # Wordbags formed from self.description_elements
@@ -174,6 +286,18 @@ class VacancyHandler:
         
         # Number of unique vacancies among all
         self.unique = None
+
+        # Number of duplicate vacancies dropped
+        self.duplicates = None
+
+        # Incremental harvest summary: found, changed, unchanged, archived
+        self.harvest_stats = None
+
+        # MongoDB store summary: inserted, updated, unchanged
+        self.store_stats = None
+
+        # Stored xlsx report path relative to 'store_path'
+        self.report = None
         
         # HH clusters of vacancies
         self.clusters = None
@@ -190,17 +314,12 @@ class VacancyHandler:
         # Modal salary
         self.modal_salary = 0
 
+        # Salary statistics calculator,
+        # salary groups bin edges could be provided to it
+        self.salary_engine = SalaryEngine()
+
         # Salary groups
-        self.salary_groups = {
-            'Менее 20000' : 0,
-            '20000-30000' : 0,
-            '30000-40000' : 0,
-            '40000-50000' : 0,
-            '50000-60000' : 0,
-            '60000-70000' : 0,
-            '70000-90000' : 0,
-            'Более 90000' : 0
-            }
+        self.salary_groups = dict.fromkeys(self.salary_engine.labels, 0)
 
         self.salaries_by_region = None
 
@@ -236,6 +355,9 @@ class VacancyHandler:
     # Actual vacancies amount in object
     #--------------------------------------------------------------------------
     def __len__(self):
+        # Raw vacancies could be replaced with columnar representation
+        if not self.vacancies and self.columns is not None:
+            return len(self.columns)
         return len(self.vacancies)
 
     #--------------------------------------------------------------------------
@@ -257,9 +379,14 @@ class VacancyHandler:
 ###############################################################################
 
     #--------------------------------------------------------------------------
-    # Retrieves vacancies from HH
-    #--------------------------------------------------------------------------
-    def _vacancies_retriever(self, delay, number):
+    def iterate_vacancies_from_hh(self, delay=None, number=None,
+                                  workers=None, rate=None, incremental=False):
+        '''Generate full vacancies from HH one by one in search results order
+        as soon as they are retrieved, so they could be analyzed meanwhile.
+        'workers' concurrent requests are limited by common 'rate' budget
+        (requests per second), legacy 'delay' turns to 1/delay budget.
+        'incremental' retrieves only vacancies new or changed since last store
+        '''
 
         #--------------------------------------------------------------------------
         # Retrieves vacancies with bief description
@@ -281,8 +408,9 @@ class VacancyHandler:
                 # Set search results page number to make another request
                 self.search_parameters['page'] = current_page
                 # Make another request to HH API
-                raw_response = requests.get(VacancyHandler.api_url,
-                                            params = self.search_parameters)
+                raw_response = VacancyHandler.http.get(
+                    VacancyHandler.api_url, params = self.search_parameters,
+                    throttle = throttle)
                 # Deserialize response
                 response = raw_response.json()
                 # Add vacancies to common batch
@@ -299,46 +427,146 @@ class VacancyHandler:
             # Collect search parameters for the current request
             self.search_arguments = response.get('arguments')
 
-            # Collecting urls which link to full vacancies
-            urls = [vacancy.get('url')
-                for vacancy in brief_vacancies]
+            return brief_vacancies
+
+        #--------------------------------------------------------------------------
+        # Retrieves one vacancy with full description
+        #--------------------------------------------------------------------------
+        def full_vacancy_retriever(url):
+            try:
+                # Retries take their slots in requests budget too
+                return VacancyHandler.http.get(url, throttle=throttle).json()
+            except requests.HTTPError as error:
+                # Vacancy was removed between search and retrievement
+                if error.response.status_code == 404:
+                    return None
+                raise
+
+        # Concurrent requests amount
+        if workers is None:
+            workers = VacancyHandler.fetch_workers
+        # Requests budget provided by user or derived from legacy delay
+        if rate is None and delay and float(delay) > 0:
+            rate = 1 / float(delay)
+        # Default budget is shared by concurrent retrievements
+        # of the process, so together they don't exceed 'fetch_rate'
+        if rate is None:
+            limiter = VacancyHandler.limiter
+        else:
+            limiter = RateLimiter(rate)
+        # Holds the caller until its turn in requests budget comes
+        throttle = limiter.wait
+
+        # Collect vacancies from search results pages
+        brief_vacancies = brief_vacancies_retriever()
+        # Leave only new and changed vacancies
+        if incremental:
+            brief_vacancies = self._changed_vacancies_filter(
+                brief_vacancies, complete=number is None)
+        # Collect urls to full vacancies
+        urls = [vacancy.get('url')
+            for vacancy in brief_vacancies]
 
-            return urls
+        # Retrieve full vacancies in search results order,
+        # only two requests per worker are submitted ahead of consumer
+        executor = ThreadPoolExecutor(max_workers=int(workers))
+        pending = collections.deque()
 
         #--------------------------------------------------------------------------
-        # Retrieves vacancies with full description
+        # Generates full vacancies as their requests complete
         #--------------------------------------------------------------------------
         def full_vacancies_retriever():
+            for url in urls:
+                pending.append(executor.submit(full_vacancy_retriever, url))
+                if len(pending) >= 2 * int(workers):
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+        try:
+            full_vacancies = full_vacancies_retriever()
             # Checks importing issue
             if __name__ == "__main__":
                 print("Requesting . . .\n")
-                # Form a list of full vacancies
-                for url in tqdm(urls):
-                    self.vacancies.append(requests.get(url).json())
-                    # With request delay provided by user
-                    time.sleep(int(delay))
-                print("\nComplete!\n\n")
-                print("\nDo you want to pickle freshly retrieved vacancies "
-                    "( [y]es, [n]o ) ?")
-                answer = input()
-                print("\n\n")
-                if answer.lower() == 'y':
-                    self.pickle_vacancies()
-            else:
-                # Form a list of full vacancies
-                for url in urls:
-                    self.vacancies.append(requests.get(url).json())
-                    # With request delay provided by user
-                    time.sleep(int(delay))
-                # Form a list of full vacancies without request delay
-                ##self.vacancies = [requests.get(url).json() for url in tqdm(urls)]
+                full_vacancies = tqdm(full_vacancies, total=len(urls))
+            for vacancy in full_vacancies:
+                # Drop vacancies removed during retrievement
+                if vacancy is not None:
+                    yield vacancy
+        finally:
+            # Consumer stopped early or retrievement failed:
+            # submitted requests are cancelled, running ones are not waited
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    #--------------------------------------------------------------------------
+    # Retrieves vacancies from HH into vacancies batch,
+    # arguments are the same as 'iterate_vacancies_from_hh()' ones
+    #--------------------------------------------------------------------------
+    def _vacancies_retriever(self, delay=None, number=None,
+                             workers=None, rate=None, incremental=False):
+
+        self.vacancies += self.iterate_vacancies_from_hh(delay, number,
+                                                         workers, rate,
+                                                         incremental)
+
+        # Checks importing issue
+        if __name__ == "__main__":
+            print("\nComplete!\n\n")
+            print("\nDo you want to pickle freshly retrieved vacancies "
+                "( [y]es, [n]o ) ?")
+            answer = input()
+            print("\n\n")
+            if answer.lower() == 'y':
+                self.pickle_vacancies()
 
-        # Collect urls to full vacancies
-        urls = brief_vacancies_retriever()
-        full_vacancies_retriever()
         # Now the class instance already contains actual vacancies
         self.__is_initial = False
 
+
+    #--------------------------------------------------------------------------
+    # Leaves only brief vacancies which are new or changed (by 'updated_at'
+    # or 'published_at' stamp) since they were stored to MongoDB.
+    # Stored vacancies absent in 'complete' search results marks as archived
+    #--------------------------------------------------------------------------
+    def _changed_vacancies_filter(self, brief_vacancies, complete=True):
+
+        #----------------------------------------------------------------------
+        # Vacancy change stamp
+        #----------------------------------------------------------------------
+        def stamp(vacancy):
+            return vacancy.get('updated_at') or vacancy.get('published_at')
+
+        # Ids of vacancies presented in search results
+        present = [vacancy.get('id')
+            for vacancy in brief_vacancies]
+        archived = []
+
+        # Shared MongoDB client of this process
+        mongodb = MongoClients.get(mongo)
+        # Connection to criteria collection of 'hh_vacancies' database
+        storage = VacancyStorage(mongodb.hh_vacancies[self.search_criteria])
+        # {id : change stamp} of stored vacancies
+        stored = storage.stamps()
+        # Partial search results can't tell which vacancies disappeared
+        if complete:
+            archived = list(stored.keys() - set(present))
+        storage.archive(archived, present)
+
+        changed = [vacancy
+            for vacancy in brief_vacancies
+                if vacancy.get('id') not in stored
+                    or stored[vacancy.get('id')] != stamp(vacancy)]
+
+        # Incremental harvest summary
+        self.harvest_stats = {'found': len(brief_vacancies),
+                              'changed': len(changed),
+                              'unchanged': len(brief_vacancies) - len(changed),
+                              'archived': len(archived)}
+
+        return changed
+
     #--------------------------------------------------------------------------
     # Announces general information on the response to the request
     # Asks for confirmation for the full retrievement
@@ -346,8 +574,8 @@ class VacancyHandler:
     #--------------------------------------------------------------------------
     def _retrievement_confirmator(self):
         # Make request to HH API
-        raw_response = requests.get(VacancyHandler.api_url,
-                                    params = self.search_parameters)
+        raw_response = VacancyHandler.http.get(VacancyHandler.api_url,
+                                               params = self.search_parameters)
         # Deserialize response
         response = raw_response.json()
         # Discover amount of search results pages
@@ -438,27 +666,64 @@ class VacancyHandler:
 
     #--------------------------------------------------------------------------
     def store_vacancies_to_mongo(self):
-        '''Store vacancies to MongoDB
+        '''Store vacancies to MongoDB,
+        stored vacancies with the same id are replaced,
+        returns {'inserted', 'updated', 'unchanged'} counts.
+        Vacancies restored with projection are not stored
+        '''
+        # Whole document replacement would drop not projected fields
+        if self.projected:
+            raise ValueError('Vacancies restored with projection '
+                             'can not be stored back')
+        # Shared MongoDB client of this process
+        mongodb = MongoClients.get(mongo)
+        # Connection to criteria collection of 'hh_vacancies' database
+        storage = VacancyStorage(mongodb.hh_vacancies[self.search_criteria])
+        # Put vacancies
+        self.store_stats = storage.upsert(self.vacancies)
+
+        return self.store_stats
+
+    #--------------------------------------------------------------------------
+    def iterate_vacancies_from_mongo(self, projection=None, batch_size=None):
+        '''Generate not archived vacancies from MongoDB one by one,
+        only 'projection' fields are retrieved ('restore_projection' default),
+        cursor retrieves 'batch_size' vacancies per round trip
         '''
-        # Instantiate MongoDB connection context
-        with MongoClient(mongo) as mongodb:
-            # Connection to criteria collection of 'hh_vacancies' database
-            collection = mongodb.hh_vacancies[self.search_criteria]
-            # Put vacancies
-            collection.insert_many(self.vacancies)
+        if projection is None:
+            projection = VacancyHandler.restore_projection
+        # Shared MongoDB client of this process
+        mongodb = MongoClients.get(mongo)
+        # Connection to criteria collection of 'hh_vacancies' database
+        storage = VacancyStorage(mongodb.hh_vacancies[self.search_criteria])
+        # Get vacancies
+        yield from storage.stream(projection, batch_size)
 
     #--------------------------------------------------------------------------
-    def restore_vacancies_from_mongo(self):
-        '''Restore vacancies from MongoDB
+    def restore_vacancies_from_mongo(self, projection=None, batch_size=None,
+                                     compact=False):
+        '''Restore not archived vacancies from MongoDB,
+        'compact' puts it straight to columnar representation
+        without keeping raw vacancies in memory ('restore_projection'
+        fields default), otherwise whole vacancies are restored
+        by default, vacancies restored with 'projection' can't
+        be stored back
         '''
-        # Instantiate MongoDB connection context
-        with MongoClient(mongo) as mongodb:
-            # Connection to criteria collection of 'hh_vacancies' database
-            collection = mongodb.hh_vacancies[self.search_criteria]
-            # Get vacancies
-            cursor = collection.find({})
+        if compact:
+            vacancies = self.iterate_vacancies_from_mongo(projection,
+                                                          batch_size)
+            # Stored vacancies are unique by id
+            self.columns = VacancyColumns(self.html_parser, self.tokenizer)
+            self.columns.extend(vacancies)
+            self.vacancies = []
+        else:
+            vacancies = self.iterate_vacancies_from_mongo(
+                projection or VacancyHandler.whole_projection, batch_size)
             # Put it to list
-            self.vacancies = list(cursor)
+            self.vacancies = list(vacancies)
+            self.projected = bool(projection)
+        # Now the class instance already contains actual vacancies
+        self.__is_initial = False
 
 
 ###############################################################################
@@ -476,38 +741,25 @@ class VacancyHandler:
         # This function forms xlsx document sheet
         #----------------------------------------------------------------------
         def form_sheet(data, columns, name, a_width, b_width):
-            # Defines sheet structure
-            sheet = pandas.DataFrame(data, columns=columns)
-            # Add sheet to xlsx document
-            sheet.to_excel(writer, name, index=False)
-            worksheet = writer.sheets[name]
-            # Set 'A' (first) column width
-            worksheet.set_column('A:A', a_width)
-            # Set 'B' (second) column width
-            worksheet.set_column('B:B', b_width)
-            # Colorized stripes from 'A2' to 'A11' lines
-            worksheet.conditional_format('A2:A11', {'type': '3_color_scale'})
+            # Rows are written straight to sheet
+            writer.sheet(name, columns, data, (a_width, b_width))
+
+        #----------------------------------------------------------------------
+        # This function forms 'not found' sheet instead of failed one,
+        # sheet added before its issue is kept
+        #----------------------------------------------------------------------
+        def form_not_found(name):
+            if name not in writer.sheets:
+                form_sheet(['Не найдено'], ['Не найдено'], name, 35, 15)
 
         #----------------------------------------------------------------------
         # This function forms xlsx document diagrams
         #----------------------------------------------------------------------
         def form_chart(data, name, amount, type, code):
-            workbook = writer.book
-            worksheet = writer.sheets[name]
-            # Add chart with custom data to sheet
-            chart = workbook.add_chart({'type': type})
-            chart.add_series({
-                'categories': f"='{name}'!$A$2:$A${amount}",
-                'values':     f"='{name}'!$B$2:$B${amount}",
-            })
-            # Diagram stylization
-            if type != 'pie':
-                chart.set_x_axis({'name': data[0],
-                                  'num_font':  {'rotation': 45}})
-                chart.set_y_axis({'name': data[1],
-                                  'major_gridlines': {'visible': False}})
-                chart.set_legend({'position': 'none'})
-            worksheet.insert_chart(code, chart)
+            writer.chart(name, data, amount, type, code)
+
+        # Issues of missing (None) results and malformed data
+        issues = (AttributeError, KeyError) + ReportWriter.errors
 
         # Xlsx file structure
         table_structure = {
@@ -524,12 +776,14 @@ class VacancyHandler:
         }
         
         # Xlsx report file path and name
-        path = ( f'{self.store_path}/vacancies/'
-                 f'{self.search_criteria}-'
-                 f'{len(self.vacancies)}.xlsx' )
+        path = f'{self._report_path()}.xlsx'
+        # Report is stored to hidden file first, so reports listing
+        # never shows partially stored report
+        storing_path = os.path.join(os.path.dirname(path),
+                                    f'.{os.path.basename(path)}')
         
-        # Instantiate ExcelWriter context
-        with pandas.ExcelWriter(path) as writer:
+        # Instantiate streaming ReportWriter context
+        with ReportWriter(storing_path) as writer:
             # Tries to form sheets
             try:
                 form_sheet( self.vacancy_names, 
@@ -537,7 +791,7 @@ class VacancyHandler:
                             'Должности', 60, 25 )
                 form_chart( table_structure['Должности'],
                             'Должности', '11', 'column', 'D2' )
-            except:
+            except issues:
                 pass
 
             try:
@@ -546,10 +800,8 @@ class VacancyHandler:
                             'Ключевые навыки', 50, 20 )
                 form_chart( table_structure['Ключевые навыки'], 
                             'Ключевые навыки', '11', 'column', 'D2' )
-            except:
-                form_sheet( ['Не найдено'], 
-                            ['Не найдено'], 
-                            'Ключевые навыки', 35, 15 )
+            except issues:
+                form_not_found('Ключевые навыки')
 
             try:
                 form_sheet( self.keywords_all, 
@@ -557,10 +809,8 @@ class VacancyHandler:
                             'Технологии', 30, 20 )
                 form_chart( table_structure['Технологии'], 
                             'Технологии', '11', 'column', 'D2' )
-            except:
-                form_sheet( ['Не найдено'], 
-                            ['Не найдено'], 
-                            'Технологии', 35, 15 )
+            except issues:
+                form_not_found('Технологии')
         
             try:
                 form_sheet( self.regions, 
@@ -568,7 +818,7 @@ class VacancyHandler:
                             'Регионы', 35, 20 )
                 form_chart( table_structure['Регионы'], 
                             'Регионы', '11', 'column', 'D2')
-            except:
+            except issues:
                 pass
 
             try:
@@ -577,17 +827,15 @@ class VacancyHandler:
                             'Опыт', 30, 20 )
                 form_chart( table_structure['Опыт'], 
                             'Опыт', '5', 'pie', 'C3' )
-            except:
+            except issues:
                 pass
         
             try:            
                 form_sheet( self.employers_brief.items(), 
                             table_structure['Работодатели'], 
                             'Работодатели', 50, 35 )
-            except:
-                form_sheet( ['Не найдено'], 
-                            ['Не найдено'], 
-                            'Работодатели', 35, 15)
+            except issues:
+                form_not_found('Работодатели')
             
             try:
                 form_sheet( self.profareas, 
@@ -595,7 +843,7 @@ class VacancyHandler:
                             'Профобласти', 55, 20 )
                 form_chart( table_structure['Профобласти'], 
                             'Профобласти', '11', 'column', 'D2' )
-            except:
+            except issues:
                 pass
     
             try:
@@ -604,7 +852,7 @@ class VacancyHandler:
                             'Специализации', 45, 20 )
                 form_chart( table_structure['Специализации'], 
                             'Специализации', '11', 'column', 'D2' )
-            except:
+            except issues:
                 pass
             
             try:
@@ -613,51 +861,183 @@ class VacancyHandler:
                             'Зарплатные группы', 25, 20 )
                 form_chart( table_structure['Группы'], 
                             'Зарплатные группы', '11', 'column', 'D2' )
-            except:
-                form_sheet( ['Не найдено'], 
-                            ['Не найдено'], 
-                            'Зарплатные группы', 35, 15 )
+            except issues:
+                form_not_found('Зарплатные группы')
 
             try:
                 form_sheet( self.salaries, 
                             table_structure['Зарплата'], 
                             'Зарплата', 25, 20 )
-            except:
-                form_sheet( ['Не найдено'], 
-                            ['Не найдено'], 
-                            'Зарплата', 35, 15 )
+            except issues:
+                form_not_found('Зарплата')
 
-            for criteria in vocabulary['Знания']:
+            # Sheets and rows are sorted, so report is the same on every run
+            for criteria in sorted(vocabulary['Знания']):
                 try:
-                    form_sheet(set(self._by_word_extractor(criteria)),
+                    form_sheet(sorted(set(self._by_word_extractor(criteria)),
+                                      key=lambda element: (len(element), element)),
                             [criteria.capitalize()],
                             criteria.capitalize(), 100, 30)
-                except:
+                except issues:
+                    pass
+
+            # Other vocabulary groups, one sheet per group
+            for group in vocabulary:
+                if group == 'Знания':
+                    continue
+                try:
+                    form_sheet(self._by_group_extractor(group),
+                            [group, 'Критерии'],
+                            group, 100, 30)
+                except issues:
                     pass
 
-            for criteria in self.description_elements_top:
+            for criteria in sorted(self.description_elements_top or {}):
                 try:
-                    form_sheet(set(self.description_elements_top.get(criteria)),
+                    form_sheet(sorted(set(self.description_elements_top.get(criteria))),
                             [criteria.capitalize()],
                             criteria.capitalize(), 100, 30)
-                except:
+                except issues:
                     pass
 
             try:
                 form_sheet( self.wordbags_all, 
                             ['Слово', 'Вхождений'], 
                             'Мешок слов', 25, 20 )
-            except:
+            except issues:
                 pass
 
+        # Publish stored report
+        os.replace(storing_path, path)
+        self.report = os.path.relpath(path, self.store_path)
+        self._report_publisher(os.path.dirname(path))
+
+
+    #--------------------------------------------------------------------------
+    def export_results(self, formats=None):
+        '''Export analysis results into files
+        'search_criteria-vacancies_amount' + format extension
+        located next to xlsx report, 'formats' are 'parquet',
+        'csv' and 'json' (all available default),
+        returns {format : file path}
+        '''
+        path = self._report_path()
+        exported = VacancyHandler.exporter.export(path,
+                                                  self._results_tables(),
+                                                  self._results_summary(),
+                                                  formats)
+        self._report_publisher(os.path.dirname(path))
+        return exported
+
+    #--------------------------------------------------------------------------
+    # Report files path without extension
+    #--------------------------------------------------------------------------
+    def _report_path(self):
+        return ( f'{self.store_path}/vacancies/'
+                 f'{self.search_criteria}-'
+                 f'{len(self)}' )
+
+    #--------------------------------------------------------------------------
+    # Analysis results tables {table : rows}, tables are named
+    # as xlsx report sheets
+    #--------------------------------------------------------------------------
+    def _results_tables(self):
+        tables = {
+            'Должности': self.vacancy_names,
+            'Ключевые навыки': self.skills_all,
+            'Технологии': self.keywords_all,
+            'Регионы': self.regions,
+            'Опыт': self.experience,
+            'Работодатели': (self.employers_brief or {}).items(),
+            'Профобласти': self.profareas,
+            'Специализации': self.specializations,
+            'Зарплатные группы': (self.salary_groups or {}).items(),
+            'Зарплата': self.salaries,
+        }
+        # Unique sentences in order of appearance
+        for criteria in vocabulary['Знания']:
+            tables[criteria.capitalize()] = list(dict.fromkeys(
+                self._by_word_extractor(criteria)))
+        for group in vocabulary:
+            if group != 'Знания':
+                tables[group] = self._by_group_extractor(group)
+        for criteria, elements in (self.description_elements_top or {}).items():
+            tables[criteria.capitalize()] = list(dict.fromkeys(elements))
+        tables['Мешок слов'] = self.wordbags_all
+
+        # Salaries of every region
+        for statistic, table in (('average_salary', 'Средняя по регионам'),
+                                 ('median_salary', 'Медиана по регионам'),
+                                 ('modal_salary', 'Модальная по регионам')):
+            tables[table] = [(region, salaries.get(statistic))
+                for region, salaries in (self.salaries_by_region or {}).items()]
+        return tables
+
+    #--------------------------------------------------------------------------
+    # Compact analysis results summary with 'top' items of every rating
+    #--------------------------------------------------------------------------
+    def _results_summary(self, top=10):
+        ratings = {
+            'vacancy_names': self.vacancy_names,
+            'skills': self.skills_all,
+            'keywords': self.keywords_all,
+            'regions': self.regions,
+            'experience': self.experience,
+            'profareas': self.profareas,
+            'specializations': self.specializations,
+            'wordbags': self.wordbags_all,
+        }
+        return {
+            'criteria': self.search_criteria,
+            'search_field': self.search_parameters.get('search_field'),
+            'geo_areas': self.search_geo_areas,
+            'vacancies': len(self),
+            'unique': self.unique,
+            'duplicates': self.duplicates,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'salaries': {'average': self.average_salary,
+                         'median': self.median_salary,
+                         'modal': self.modal_salary},
+            'salary_groups': self.salary_groups,
+            # Salaries lists are not included
+            'salaries_by_region': {region: {statistic: value
+                    for statistic, value in salaries.items()
+                        if statistic != 'salary_all'}
+                for region, salaries in (self.salaries_by_region or {}).items()},
+            'top': {rating: [list(row) for row in (rows or [])[:top]]
+                for rating, rows in ratings.items()},
+        }
+
+    #--------------------------------------------------------------------------
+    def report_key(self):
+        '''Reports cache key of this search
+        '''
+        return ReportCache.key(self.search_criteria,
+                               self.search_parameters.get('search_field'),
+                               self.search_geo_areas)
+
+    #--------------------------------------------------------------------------
+    # Touch publish marker of reports directory, so cached
+    # reports listings (web application) are formed again
+    #--------------------------------------------------------------------------
+    def _report_publisher(self, directory):
+        marker = os.path.join(directory, VacancyHandler.publish_marker)
+        with open(marker, 'a'):
+            os.utime(marker)
+
 
 ###############################################################################
 ##################################  Analyze  ##################################
 ###############################################################################
 
     #--------------------------------------------------------------------------
-    def analyze(self):
+    def analyze(self, duplicates_key='id', duplicates_policy='first',
+                workers=None):
         '''Call all analyze methods
+        Duplicates are found by 'id' or 'content' ('duplicates_key'),
+        'first' seen or 'newest' published is kept ('duplicates_policy'),
+        vacancies chunks are parsed by 'workers' processes
+        ('analyze_workers' default)
         '''
         # If class instance doesn't contains actual vacancies
         if self.__is_initial:
@@ -665,10 +1045,52 @@ class VacancyHandler:
             if __name__ == "__main__":
                 self._retrievement_confirmator()
             else:
-                # Retrieve it
-                self._vacancies_retriever(delay=10, number=None)
+                # Retrieve it within common requests budget
+                self._vacancies_retriever(number=None)
+
+        # Raw vacancies are not replaced with columnar representation yet
+        if self.vacancies or self.columns is None:
+            self._duplicate_vacancies_remover(duplicates_key, duplicates_policy)
+            self._columns_builder(workers)
+        self._results_collector()
+
+    #--------------------------------------------------------------------------
+    def analyze_stream(self, vacancies, duplicates_key='id', workers=None):
+        '''Analyze vacancies fed one by one in single pass
+        from any iterable: MongoDB cursor, unpickled list or
+        'iterate_vacancies_from_hh()' retriever, raw vacancies
+        are not kept. First seen one of duplicates is kept,
+        vacancies chunks are parsed by 'workers' processes
+        '''
 
-        self._duplicate_vacancies_remover()
+        #----------------------------------------------------------------------
+        # Drop duplicates of already fed vacancies
+        #----------------------------------------------------------------------
+        def unique_vacancies():
+            # Fingerprints of already fed vacancies
+            seen = set()
+            for vacancy in vacancies:
+                vacancy_fingerprint = self._vacancy_fingerprint(vacancy,
+                                                                duplicates_key)
+                if vacancy_fingerprint in seen:
+                    self.duplicates += 1
+                    continue
+                seen.add(vacancy_fingerprint)
+                yield vacancy
+
+        self.vacancies = []
+        self.duplicates = 0
+        self.columns = self._parallel_columns_builder(unique_vacancies(),
+                                                      workers)
+
+        # Now the class instance already contains actual vacancies
+        self.__is_initial = False
+        self._results_collector()
+
+    #--------------------------------------------------------------------------
+    # Form all analysis results from columnar representation
+    #--------------------------------------------------------------------------
+    def _results_collector(self):
         self._skills_collector()
         self._experience_collector()
         self._prof_spec_collector()
@@ -677,6 +1099,7 @@ class VacancyHandler:
         self._regions_collector()
         self._keywords_extractor()
         self._description_elements_extractor()
+        self._vocabulary_tagger()
         self._description_sections_extractor()
         self._wordbags_extractor()
         self._unique_counter()
@@ -684,32 +1107,68 @@ class VacancyHandler:
         self._employers_collector()
 
 
+    #--------------------------------------------------------------------------
+    def compact(self, duplicates_key='id', duplicates_policy='first',
+                workers=None):
+        '''Replace raw vacancies with compact columnar representation,
+        raw vacancies are not available for store and filters after it
+        '''
+        self._duplicate_vacancies_remover(duplicates_key, duplicates_policy)
+        self._columns_builder(workers)
+        self.vacancies = []
+
+
 ###############################################################################
 #################################  Collectors  ################################
 ###############################################################################
 
     #--------------------------------------------------------------------------
-    # Collect key skills from vacancies
+    # Build compact columnar representation of vacancies batch
     #--------------------------------------------------------------------------
-    def _skills_collector(self):
+    def _columns_builder(self, workers=None):
+        self.columns = self._parallel_columns_builder(self.vacancies, workers)
 
-        # Collect raw skills
-        raw_key_skills = [vacancy.get('key_skills')
-            for vacancy in self.vacancies]
-
-        # Clean skills
-        key_skills = [key_skill.get('name')
-            for employer_batch in raw_key_skills
-                for key_skill in employer_batch]
+    #--------------------------------------------------------------------------
+    # Build columns from vacancies iterable: 'workers' processes parse
+    # 'analyze_chunk' vacancies chunks, partial columns are merged
+    # in vacancies order, so result is the same as serial one.
+    # Only two chunks per worker are in flight at a time
+    #--------------------------------------------------------------------------
+    def _parallel_columns_builder(self, vacancies, workers=None):
+        if workers is None:
+            workers = VacancyHandler.analyze_workers
+        columns = VacancyColumns(self.html_parser, self.tokenizer)
+        if int(workers) <= 1:
+            columns.extend(vacancies)
+            return columns
+
+        vacancies = iter(vacancies)
+        chunks = iter(lambda: list(islice(vacancies,
+                                          VacancyHandler.analyze_chunk)), [])
+        context = multiprocessing.get_context(
+            VacancyHandler.analyze_start_method)
+        with ProcessPoolExecutor(max_workers=int(workers),
+                                 mp_context=context) as executor:
+            # Partial columns in vacancies order
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(executor.submit(VacancyColumns.from_vacancies,
+                                               chunk, self.html_parser,
+                                               self.tokenizer))
+                if len(pending) >= 2 * int(workers):
+                    columns.merge(pending.popleft().result())
+            while pending:
+                columns.merge(pending.popleft().result())
+
+        return columns
 
-        # Form {key_skill : number of entries}
-        key_skills_counted = {skill : key_skills.count(skill)
-            for skill in key_skills}
+    #--------------------------------------------------------------------------
+    # Collect key skills from vacancies
+    #--------------------------------------------------------------------------
+    def _skills_collector(self):
 
-        # Sort by number of entries
-        self.skills_all = sorted(key_skills_counted.items(),
-                                 key=lambda x: x[1],
-                                 reverse=True)
+        # Form (key_skill, number of entries) sorted by number of entries
+        self.skills_all = self.columns.frequencies('skill')
         
         # Conveniently cropped batch (first 100)
         self.skills = self.skills_all[0:100]
@@ -719,90 +1178,36 @@ class VacancyHandler:
     #--------------------------------------------------------------------------
     def _experience_collector(self):
 
-        # Collect raw experience
-        raw_experience = [full_vacancy.get('experience').get('name')
-            for full_vacancy in self.vacancies]
-
-        # Form {experience : number of entries}
-        experience_counted = {experience : raw_experience.count(experience)
-            for experience in raw_experience}
-
-        # Sort by number of entries
-        self.experience = sorted(experience_counted.items(),
-                                 key=lambda x: x[1],
-                                 reverse=True)
+        # Form (experience, number of entries) sorted by number of entries
+        self.experience = self.columns.frequencies('experience')
 
     #--------------------------------------------------------------------------
     # Collect vacancy names
     #--------------------------------------------------------------------------
     def _vacancy_names_collector(self):
 
-        # Collect raw vacancy names
-        vacancy_names = [vacancy.get('name').lower()
-            for vacancy in self.vacancies]
-
-        # Form {vacancy name : number of entries}
-        vacancy_names_counted = {name.capitalize() : vacancy_names.count(name)
-            for name in vacancy_names}
-
-        # Sort by number of entries
-        self.vacancy_names = sorted(vacancy_names_counted.items(),
-                                    key=lambda x: x[1],
-                                    reverse=True)
+        # Form (vacancy name, number of entries) sorted by number of entries
+        self.vacancy_names = [(name.capitalize(), count)
+            for name, count in self.columns.frequencies('name')]
 
     #--------------------------------------------------------------------------
     # Collect profareas and specializations from vacancies
     #--------------------------------------------------------------------------
     def _prof_spec_collector(self):
 
-        # Collect raw profareas and specializations data
-        raw_prof_spec_data = [vacancy.get('specializations')
-            for vacancy in self.vacancies]
-        
-        # Clean
-        prof_spec_data = [prof_spec_data
-            for prof_spec_data_list in raw_prof_spec_data
-                for prof_spec_data in prof_spec_data_list]
-        
-        # Collect raw profareas
-        profareas = [key['profarea_name']
-            for key in prof_spec_data]
+        # Forms (profarea, number of entries) sorted by number of entries
+        self.profareas = self.columns.frequencies('profarea')
 
-        # Collect raw specializations
-        specializations = [key['name']
-            for key in prof_spec_data]
-        
-        # Forms {profarea : number of entries}
-        profareas_counted = {profarea : profareas.count(profarea)
-            for profarea in profareas}
-        
-        # Forms {specialization : number of entries}        
-        specializations_counted = {specialization :
-                                   specializations.count(specialization)
-            for specialization in specializations}
-
-        # Sort by number of entries
-        self.profareas = sorted(profareas_counted.items(),
-                                key=lambda x: x[1],
-                                reverse=True)
-
-        # Sort by number of entries        
-        self.specializations = sorted(specializations_counted.items(),
-                                         key=lambda x: x[1],
-                                         reverse=True)
+        # Forms (specialization, number of entries) sorted by number of entries
+        self.specializations = self.columns.frequencies('specialization')
     
     #--------------------------------------------------------------------------
     # Collect creation dates from vacancies
     #--------------------------------------------------------------------------
     def _creation_dates_collector(self):
         
-        # Collect creation dates
-        raw_create_dates = [vacancy.get('created_at')
-            for vacancy in self.vacancies]
-        
-        # Sort by date of publication
-        self.dates = sorted({date : raw_create_dates.count(date)
-            for date in raw_create_dates})
+        # Sort unique creation dates by date of publication
+        self.dates = sorted(self.columns.values('created_at'))
     
     #--------------------------------------------------------------------------
     # Collect employers
@@ -810,31 +1215,20 @@ class VacancyHandler:
     def _employers_collector(self):
 
         # Collect full employers info
-        self.employers_full = [vacancy.get('employer')
-            for vacancy in self.vacancies]
+        self.employers_full = self.columns.rows('employer')
         
         # Collect brief employers info
-        self.employers_brief = {vacancy.get('employer').get('name') :
-                                vacancy.get('employer').get('alternate_url')
-            for vacancy in self.vacancies}
+        self.employers_brief = {employer.get('name') :
+                                employer.get('alternate_url')
+            for employer in self.employers_full}
 
     #--------------------------------------------------------------------------
     # Collect vacancy regions
     #--------------------------------------------------------------------------
     def _regions_collector(self):
 
-        # Collect vacancy regions
-        regions = [vacancy.get('area').get('name')
-            for vacancy in self.vacancies]
-
-        # Form {region : number of entries}
-        regions_counted = {region : regions.count(region)
-            for region in regions}
-        
-        # Sort by number of entries
-        self.regions = sorted(regions_counted.items(),
-                              key=lambda x: x[1],
-                              reverse=True)
+        # Form (region, number of entries) sorted by number of entries
+        self.regions = self.columns.frequencies('area')
 
 
 ###############################################################################
@@ -848,25 +1242,20 @@ class VacancyHandler:
     #--------------------------------------------------------------------------
     def _wordbags_extractor(self):
 
+        # Tokenizer descriptions were split by
+        tokenizer = self.columns.descriptions.tokenizer
+
         #----------------------------------------------------------------------
         # Forms one aggregated wordbag from all vacancies descriptions content
         #----------------------------------------------------------------------
         def extract_aggregated():
-            # Join all vacancies descriptions into one string
-            all_words_in_string = ' '.join(self.description_elements_all)    
-            # Count words occurrences in it
-            bags_words = collections.Counter(re.findall(r'\w+',
-                                             all_words_in_string))
-            # Sort by frequency of entry
-            wordbags_all = sorted(bags_words.items(),
-                                    key=lambda x: x[1],
-                                    reverse=True)
-            # Drop short words (less than 4 letters)
-            result = [word
-                for word in wordbags_all
-                    if len(word[0]) > 4]
+            # Count words occurrences in all vacancies descriptions
+            # elements split into words once by accumulator
+            bags_words = collections.Counter()
+            for words in self.columns.descriptions.elements.values():
+                bags_words.update(words)
 
-            return result
+            return self._wordbag_former(bags_words)
 
         #----------------------------------------------------------------------
         # Forms word bag by one of the top 4 (description_sections_top) subject
@@ -876,32 +1265,21 @@ class VacancyHandler:
             # If criteria keyword in the top (10) of description categories
             if self.description_elements.get(criteria):
                 # Clean occurrences
-                clear_strings = [re.sub("[^А-Яа-я0-9-.\s]", "",
-                                        describe_string.lower().strip().strip('.'))
+                clear_strings = [tokenizer.clean(describe_string)
                     for describe_string in self.description_elements.get(criteria)]
 
-                # Remove duplicates
-                unique_clear_set = set(clear_strings)
+                # Remove duplicates keeping first entry order
                 unique_strings = [str(string)
-                    for string in unique_clear_set]
+                    for string in dict.fromkeys(clear_strings)]
                 ##unique_strings = sorted(unique_strings, key=len)
 
-                # Count word occurrences in isolated strings
-                bags_words = [collections.Counter(re.findall(r'\w+', string))
-                    for string in unique_strings]
-                
-                # Join counted word occurrences by all strings batch
-                bag_words = sum(bags_words, collections.Counter())
-                # Sort by frequency of entry 
-                sorted_bag = sorted(bag_words.items(),
-                                    key=lambda x: x[1],
-                                    reverse=True)
-                # Drop short words (less than 4 letters)
-                result = [word
-                    for word in sorted_bag
-                        if len(word[0]) > 4]
-
-                return result
+                # Count word occurrences of all strings batch
+                # in one counter updated in place
+                bag_words = collections.Counter()
+                for string in unique_strings:
+                    bag_words.update(tokenizer.words(string))
+
+                return self._wordbag_former(bag_words)
         
         # Form categorized wordbags by one of the top 4 subject
         self.wordbags = {criteria : extract_categorized(criteria)
@@ -915,31 +1293,9 @@ class VacancyHandler:
     #--------------------------------------------------------------------------
     def _keywords_extractor(self):
 
-        # Form list of vacancies descriptions
-        descriptions = [BeautifulSoup(vacancy.get('description'),
-                                      'html.parser').get_text()
-            for vacancy in self.vacancies]
-
-        # Extract only english letters in descriptions
-        raw_eng_extraxtions = [re.sub("[^A-Za-z]", " ", description.strip())
-            for description in descriptions]
-
-        # Clean and form list of words
-        eng_words = [word 
-            for string in raw_eng_extraxtions
-                for word in string.split()]
-
-        # Drop null
-        clear_eng_words = list(filter(None, eng_words))
-
-        # Form {word : number of entries}
-        eng_words_mixed = {word : clear_eng_words.count(word)
-            for word in clear_eng_words}
-
-        # Sorted by number of entries
-        self.keywords_all = sorted(eng_words_mixed.items(),
-                                   key=lambda x: x[1],
-                                   reverse=True)
+        # Form (word, number of entries) sorted by number of entries
+        # from english words accumulated from descriptions
+        self.keywords_all = self.columns.descriptions.keywords.most_common()
         
         # Conveniently cropped batch (first 100)
         self.keywords = self.keywords_all[0:100]
@@ -949,63 +1305,28 @@ class VacancyHandler:
     #--------------------------------------------------------------------------
     def _description_elements_extractor(self):
 
-        # bs4.BeautifulSoup objects list formed from vacancy descriptions
-        description_soups = [BeautifulSoup(vacancy.get('description'), 'html.parser')
-            for vacancy in self.vacancies]
-        
-        # Extract content framed in <p> tags
-        p_tags = [p.text.strip().lower()
-            for soup in description_soups
-                for p in soup.find_all('p')]
-
-        # Extract content framed in <li> tags
-        li_tags = [li.text.strip().lower()
-            for soup in description_soups
-                for li in soup.find_all('li')]
-        
-        # Join and drop dublicates
-        self.description_elements_all = list(set(p_tags + li_tags))
+        # Unique content framed in <p> and <li> tags in first entry order
+        self.description_elements_all = list(
+            self.columns.descriptions.elements)
     
+    #--------------------------------------------------------------------------
+    # Tag description elements with all vocabulary criteria in one pass
+    #--------------------------------------------------------------------------
+    def _vocabulary_tagger(self):
+        self.vocabulary_tags = VacancyHandler.matcher.tag(
+            self.description_elements_all)
+
     #--------------------------------------------------------------------------
     # Extract multiple different things from vacancy description bodies
     #--------------------------------------------------------------------------
     def _description_sections_extractor(self):
 
-        # bs4.BeautifulSoup objects list formed from vacancy descriptions
-        description_soups = [BeautifulSoup( vacancy.get('description'),
-                                            'html.parser' )
-            for vacancy in self.vacancies]
-        
-        # Vacancy descriptions sections list grouped
-        # by vacancy framed into <strong> tags
-        strong_soups = [description_soup.findAll('strong')
-            for description_soup in description_soups]
-
-        # All vacancy descriptions sections
-        # from all vacancies in common list
-        strongs = [strong.text
-            for strong_soup in strong_soups
-                for strong in strong_soup]
-
-        # Drop english text
-        russian_strongs = [re.sub("[^А-Яа-я\s]", "", strong.strip())
-            for strong in strongs]
-
-        # Drop null
-        clear_strongs = list(filter(None, russian_strongs))
-        # Drop excess spaces
-        clear_strongs = [' '.join(string.split()) for string in clear_strongs]
-        # Drop empty
-        clear_strongs = [string for string in clear_strongs if string]
-
-        # Forms {string : number of entries}
-        strongs_counted = {string : clear_strongs.count(string)
-            for string in clear_strongs}
-
-        # Sort by number of entries
-        sorted_strongs = sorted(strongs_counted.items(),
-                                key=lambda x: x[1],
-                                reverse=True)
+        # Unique (section heading framed into <strong> tags, <li> item
+        # following it) from all vacancies in first entry order
+        sections = self.columns.descriptions.sections
+
+        # Forms (russian heading, number of entries) sorted by number of entries
+        sorted_strongs = self.columns.descriptions.strongs.most_common()
         
         # Select text sorted by length
         self.description_sections = sorted([strong[0]
@@ -1023,28 +1344,16 @@ class VacancyHandler:
         self.description_elements_top = {key: []
             for key in self.description_sections_top}
 
-        for description in description_soups:
-            strongs = description.findAll('strong')
-            for strong in strongs:
-
-                for top in strong_top:
-                    if strong.get_text().count(top):
-                    ##if len(strong.findNext().findAll('li')) > 0:
-                        try:
-                            self.description_elements[top] += [item.text
-                                for item in strong.findNext().findAll('li')]
-                        except AttributeError:
-                            pass
-                
-                for top in self.description_sections_top:
-                    if strong.get_text().count(top):
-                    ##if len(strong.findNext().findAll('li')) > 0:
-                        try:
-                            # Suffix '.lstrip().capitalize()' clarifies but slows down
-                            self.description_elements_top[top] += [item.text.lstrip().capitalize()
-                                for item in strong.findNext().findAll('li')]
-                        except AttributeError:
-                            pass
+        for strong, item in sections:
+            for top in strong_top:
+                if strong.count(top):
+                    self.description_elements[top].append(item)
+
+            for top in self.description_sections_top:
+                if strong.count(top):
+                    # Suffix '.lstrip().capitalize()' clarifies but slows down
+                    self.description_elements_top[top].append(
+                        item.lstrip().capitalize())
 
 
 ###############################################################################
@@ -1052,91 +1361,22 @@ class VacancyHandler:
 ###############################################################################
 
     #--------------------------------------------------------------------------
-    # Calculate average, median, modal salaries
+    # Calculate average, median, modal salaries for all and every region
     # and group salaries into number of clusters
     #--------------------------------------------------------------------------
     def _salary_calculator(self):
 
-        #----------------------------------------------------------------------
-        # Return appropriate salary group by salary value
-        #----------------------------------------------------------------------
-        def _get_salary_group(salary):
-            return {
-                salary < 20000: 'Менее 20000',
-                20000 <= salary < 30000: '20000-30000',
-                30000 <= salary < 40000: '30000-40000',
-                40000 <= salary < 50000: '40000-50000',
-                50000 <= salary < 60000: '50000-60000',
-                60000 <= salary < 70000: '60000-70000',
-                70000 <= salary < 90000: '70000-90000',
-                90000 <= salary: 'Более 90000'
-            }[True]
-        
-        sum = total = 0
-        salary_all = []
-    
-        regions = [region[0] for region in self.regions]
-    
-        region_salary_dict = {'average_salary': 0,
-                              'median_salary': 0,
-                              'modal_salary': 0,
-                              'sum': 0,
-                              'total': 0,
-                              'salary_all': [],
-                            }
-
-        self.salaries_by_region = {region: region_salary_dict
-            for region in regions}
+        salary_statistics = self.salary_engine.calculate(self.columns.salaries())
 
-        for vacancy in self.vacancies:
+        self.average_salary = salary_statistics['average_salary']
+        self.median_salary = salary_statistics['median_salary']
+        self.modal_salary = salary_statistics['modal_salary']
+        self.salary_groups = salary_statistics['salary_groups']
 
-            region = vacancy.get('area').get('name')
-
-            if vacancy.get('salary'):
-                salary = dict(vacancy['salary'])
-                if salary.get('currency') == 'RUR':
-                    if salary.get('gross'):
-                        if salary.get('from'):
-                            salary['from'] = salary['from'] * 0.87
-                        if salary.get('to'):
-                            salary['to'] = salary['to'] * 0.87
-                    if salary.get('from'):
-                        self.salaries_by_region[region]['sum'] += salary.get('from')
-                        self.salaries_by_region[region]['total'] += 1
-                        self.salaries_by_region[region]['salary_all'].append(salary.get('from'))
-                        self.salary_groups[_get_salary_group(int(salary.get('from')))] += 1
-                        salary_all.append(salary.get('from'))
-                        sum += salary.get('from')
-                        total += 1
-                    if salary.get('to'):
-                        self.salaries_by_region[region]['sum'] += salary.get('to')
-                        self.salaries_by_region[region]['total'] += 1
-                        self.salaries_by_region[region]['salary_all'].append(salary.get('to'))                       
-                        self.salary_groups[_get_salary_group(int(salary.get('to')))] += 1
-                        salary_all.append(salary.get('to'))
-                        sum += salary.get('to')
-                        total += 1
-
-        # Calculate median salary
-        self.median_salary = statistics.median(salary_all)
-
-        # Calculate average salary        
-        if total > 0:
-            self.average_salary = round(sum/total)
-
-        for region in regions:
-            self.salaries_by_region[region]['median_salary'] = \
-                statistics.median(self.salaries_by_region[region]['salary_all'])
-
-            if self.salaries_by_region[region]['total'] > 0:
-                self.salaries_by_region[region]['average_salary'] = \
-                    round(self.salaries_by_region[region]['sum'] \
-                        / self.salaries_by_region[region]['total'])
-        
-        # Calculate modal salary
-        for group, salary in self.salary_groups.items():
-            if salary == max(self.salary_groups.values()):
-                self.modal_salary = group
+        # Regions in order of number of vacancies
+        self.salaries_by_region = {region:
+                                   salary_statistics['salaries_by_region'][region]
+            for region, count in self.regions}
 
         self.salaries = [('Средняя', self.average_salary),
                          ('Медиана', self.median_salary),
@@ -1148,27 +1388,69 @@ class VacancyHandler:
 ###################################  Helpers  #################################
 ###############################################################################
 
+    #--------------------------------------------------------------------------
+    # Form (word, number of entries) of counted words sorted by number
+    # of entries without short words (less than 5 letters), words with
+    # equal number of entries keep the order of its first entry.
+    # Only 'wordbags_top' most frequent words are selected by heap
+    #--------------------------------------------------------------------------
+    def _wordbag_former(self, bag):
+        # Drop short words before ordering
+        words = [(word, number)
+            for word, number in bag.items()
+                if len(word) > 4]
+        if VacancyHandler.wordbags_top is None:
+            # Sort by frequency of entry
+            return sorted(words, key=lambda x: x[1], reverse=True)
+        return heapq.nlargest(VacancyHandler.wordbags_top, words,
+                              key=lambda x: x[1])
+
     #--------------------------------------------------------------------------       
     # Get python list of list 'description_sections_top'
     # filtered by custom 'filter_vocabulary' key
     #--------------------------------------------------------------------------
-    # Clear, but slow version
+    # Clear version, vocabulary criteria are found by automaton
     def _by_word_extractor(self, criteria):
 
-        result = []
-
-        for element in self.description_elements_all:
-            if criteria in element:
-                if element:
-                    # Clen string from misc symbols
-                    while element[0].isalpha() == False:
-                        element = element.lstrip(element[0])
-                        if not element:
-                            break
-                    result.append(element.capitalize())
-        
+        # Vocabulary criteria are tagged beforehand
+        if (self.vocabulary_tags is not None
+                and criteria in VacancyHandler.matcher.criteria):
+            result = [self._element_cleaner(self.description_elements_all[index])
+                for index in self.vocabulary_tags.get(criteria, [])]
+        else:
+            result = [self._element_cleaner(element)
+                for element in self.description_elements_all
+                    if criteria in element]
+
         return sorted(result, key=len)
 
+    #--------------------------------------------------------------------------
+    # Get python list of (description element, its criteria) of all
+    # criteria of 'group' vocabulary group
+    #--------------------------------------------------------------------------
+    def _by_group_extractor(self, group):
+
+        # {element index : found criteria}
+        found = {}
+        for criteria in sorted(vocabulary[group]):
+            for index in self.vocabulary_tags.get(criteria, []):
+                found.setdefault(index, []).append(criteria)
+
+        result = [(self._element_cleaner(self.description_elements_all[index]),
+                   ', '.join(criteria))
+            for index, criteria in sorted(found.items())]
+
+        return sorted(result, key=lambda row: len(row[0]))
+
+    #--------------------------------------------------------------------------
+    # Clean description element from leading misc symbols
+    #--------------------------------------------------------------------------
+    def _element_cleaner(self, element):
+        for position, char in enumerate(element):
+            if char.isalpha():
+                return element[position:].capitalize()
+        return ''
+
     #--------------------------------------------------------------------------       
     # Get python list of list 'description_sections_top'
     # filtered by custom 'filter_vocabulary' key
@@ -1186,24 +1468,61 @@ class VacancyHandler:
 ###############################################################################
     
     #--------------------------------------------------------------------------
-    # Remove duplicates in vacancies list
+    # Vacancy fingerprint: 'id' (HH vacancy id) or 'content' (vacancy content
+    # hash), MongoDB '_id' is not a part of content
     #--------------------------------------------------------------------------
-    def _duplicate_vacancies_remover(self):
+    def _vacancy_fingerprint(self, vacancy, key='id'):
+        if key == 'id' and vacancy.get('id') is not None:
+            return vacancy.get('id')
+        content = json.dumps({field: value
+            for field, value in vacancy.items()
+                if field != '_id'},
+            sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
 
+    #--------------------------------------------------------------------------
+    # Remove duplicates in vacancies list in linear time
+    # 'key' - 'id' (HH vacancy id) or 'content' (vacancy content fingerprint)
+    # 'policy' - 'first' keeps first seen, 'newest' keeps the latest published
+    # Returns number of dropped duplicates
+    #--------------------------------------------------------------------------
+    def _duplicate_vacancies_remover(self, key='id', policy='first'):
+
+        #----------------------------------------------------------------------
+        # Vacancy publication time, unknown one is the oldest
+        #----------------------------------------------------------------------
+        def published(vacancy):
+            try:
+                return datetime.strptime(vacancy.get('published_at'),
+                                         '%Y-%m-%dT%H:%M:%S%z').timestamp()
+            except (TypeError, ValueError):
+                return float('-inf')
+
+        # Kept vacancies
         unique_vacancies = []
+        # {fingerprint : kept vacancy position}
+        positions = {}
 
         for vacancy in self.vacancies:
-            if vacancy not in unique_vacancies:
+            vacancy_fingerprint = self._vacancy_fingerprint(vacancy, key)
+            position = positions.get(vacancy_fingerprint)
+            if position is None:
+                positions[vacancy_fingerprint] = len(unique_vacancies)
                 unique_vacancies.append(vacancy)
+            elif policy == 'newest':
+                if published(vacancy) > published(unique_vacancies[position]):
+                    unique_vacancies[position] = vacancy
 
+        self.duplicates = len(self.vacancies) - len(unique_vacancies)
         self.vacancies = unique_vacancies
 
+        return self.duplicates
+
     #--------------------------------------------------------------------------
     # Count unique vacancies in vacancies list
     #--------------------------------------------------------------------------
     def _unique_counter(self):
-        self.unique = len({vacancy.get('id')
-            for vacancy in self.vacancies})
+        self.unique = len(self.columns.values('id'))
 
 
 ###################################  Main  ####################################
@@ -13,19 +13,27 @@
 
 # Import required modules
 # Flask python web framework itself:
-from flask import Flask, render_template, flash, request, Markup, send_from_directory
+from flask import Flask, render_template, flash, request, send_from_directory, abort, make_response
+# Reports path check:
+from werkzeug.security import safe_join
+# Report file name quoting for headers:
+from urllib.parse import quote
+# Report content type:
+import mimetypes
 # Html form handlers:
 from wtforms import Form, TextField, TextAreaField, validators, StringField, SubmitField
 # Some stuff to serialize objects:
 from json import dumps
-# MongoDB driver:
-from pymongo import MongoClient
+# Shared MongoDB clients:
+from mongoclients import MongoClients
 # Our beloved requests :) :
 import requests
 # Directory walking stuff for xlsx reports listing:
 import os
-# Our send mail class:
-from mailsender import MailSender
+# Our background mail outbox:
+from mailoutbox import MailOutbox
+# Cached xlsx reports listing:
+from reportcatalog import ReportCatalog
 # And finally, our credentials:
 from credentials import SECRET_KEY, mongo, mail_creds, store_path
 
@@ -38,6 +46,12 @@ app.config.from_object(__name__)
 app.config['SECRET_KEY'] = SECRET_KEY
 # Directory with our reports
 app.config['REPORTS_DIRECTORY'] = store_path
+# Browser cache lifetime of reports in seconds, reports are revalidated
+# by ETag/Last-Modified after it (reports are replaced atomically)
+app.config['REPORTS_MAX_AGE'] = 86400
+# Internal nginx location with reports directory, e.g. '/internal-reports/',
+# nginx sends reports itself (X-Accel-Redirect) if it's set
+app.config['REPORTS_ACCEL_REDIRECT'] = os.environ.get('REPORTS_ACCEL_REDIRECT')
 
 # Define vacancy order html form
 class VacancyOrderForm(Form):
@@ -63,69 +77,109 @@ error = 'Пожалуйста, заполните все имеющиеся по
 
 # This function adds a request or parse order to MongoDB.
 def add_order_to_mongo(email, occupation=None, criteria=None):
-    # Instantiate MongoDB connection context
-    with MongoClient(mongo) as mongodb:
-        # Connection to 'harvest' collection of 'hh_orders' database
-        collection = mongodb.hh_orders['harvest']
-        # Put request order
-        if occupation:
-            # If vacancy request
-            order = {'customer': email, 'occupation': occupation}
-            # Add order to MongoDB
-            collection.insert(order)
-            # Send mail notification
-            subject = 'Laboranalysis application gets the new order'
-            # To admin, with above subject and 'order' body
-            mail = MailSender( [mail_creds['admin']], 
-                                subject, 
-                                str(order) )
-            mail.send_email()
-        else:
-            # If resume request
-            order = {'customer': email, 'criteria': criteria}
-            # Add order to MongoDB
-            collection.insert(order)
-            # Send mail notification
-            subject = 'Laboranalysis application gets the new order'
-            # To admin, with above subject and 'order' body
-            mail = MailSender( [mail_creds['admin']], 
-                                subject, 
-                                str(order) )
-            mail.send_email()
-
-# This function forms list of xlsx report files from 'store_path' directory.
-def get_reports_list(report_type):
-    # Forms path to directory with xlsx reports
-    path = os.path.join(store_path, report_type)
-    # Forms list of available reports from xlsx files located in the directory
-    reports = [report.split('.')[0] 
-        for report in os.listdir(path) 
-            if os.path.isfile(os.path.join(path, report))]
-    return reports
+    # Shared MongoDB client of this process
+    mongodb = MongoClients.get(mongo)
+    # Connection to 'queue' collection of 'hh_orders' database
+    collection = mongodb.hh_orders['queue']
+    # Mail outbox in 'outbox' collection of 'hh_mail' database
+    outbox = MailOutbox(mongodb.hh_mail['outbox'])
+    # Put request order
+    if occupation:
+        # If vacancy request
+        order = {'customer': email, 'occupation': occupation,
+                 'status': 'harvest'}
+        # Add order to MongoDB queue for harvest service
+        collection.insert_one(order)
+        # Send mail notification
+        subject = 'Laboranalysis application gets the new order'
+        # To admin, with above subject and 'order' body,
+        # it's sent in background by outbox worker
+        outbox.put( [mail_creds['admin']], 
+                    subject, 
+                    str(order) )
+    else:
+        # If resume request
+        order = {'customer': email, 'criteria': criteria,
+                 'status': 'harvest'}
+        # Add order to MongoDB queue for harvest service
+        collection.insert_one(order)
+        # Send mail notification
+        subject = 'Laboranalysis application gets the new order'
+        # To admin, with above subject and 'order' body,
+        # it's sent in background by outbox worker
+        outbox.put( [mail_creds['admin']], 
+                    subject, 
+                    str(order) )
+
+# Cached listings of xlsx report files from 'store_path' directory
+catalogs = {report_type: ReportCatalog(os.path.join(store_path, report_type))
+    for report_type in ('vacancies', 'resumes')}
+
+# URL binding
+@app.route('/health')
+# Health check for load balancer and container orchestration
+def health():
+    # MongoDB is required to accept orders
+    if MongoClients.ping(mongo):
+        return 'OK', 200
+    return 'MongoDB is unreachable', 503
 
 # URL binding
 @app.route('/reports/<path:filename>')
 # Function which exposing xlsx reports to main page
 def download_file(filename):
-    return send_from_directory( app.config['REPORTS_DIRECTORY'],
-                                filename, 
-                                as_attachment=True )
+    # Reports outside of reports directory are not exposed
+    path = safe_join(app.config['REPORTS_DIRECTORY'], filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    accel = app.config['REPORTS_ACCEL_REDIRECT']
+    if not accel:
+        # Conditional (ETag, Last-Modified) and range requests are handled,
+        # file is sent by gunicorn sendfile when it's available
+        return send_from_directory( app.config['REPORTS_DIRECTORY'],
+                                    filename,
+                                    as_attachment=True,
+                                    conditional=True,
+                                    etag=True,
+                                    max_age=app.config['REPORTS_MAX_AGE'] )
+    # Let nginx send report from internal location, so worker is released
+    # at once, nginx handles conditional and range requests itself
+    response = make_response('')
+    response.headers['X-Accel-Redirect'] = (accel.rstrip('/') + '/'
+                                            + quote(filename))
+    mimetype, encoding = mimetypes.guess_type(filename)
+    # Compressed exports are sent as is
+    if encoding == 'gzip':
+        mimetype = 'application/gzip'
+    response.headers['Content-Type'] = mimetype or 'application/octet-stream'
+    response.headers['Content-Disposition'] = ("attachment; filename*=UTF-8''"
+                                               + quote(os.path.basename(path)))
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['REPORTS_MAX_AGE']
+    return response
 
 # URL binding
 @app.route("/", methods=['GET', 'POST'])
 # Default handler function which will start when our root web app Url will be visited
 def _index():
-    # Form lists of URLs
-    reports = get_reports_list('vacancies')
-    vreports = [Markup(f'<a href="/reports/vacancies/{report}.xlsx" class="links">{report}</a> <br>')
-            for report in reports]
-    reports = get_reports_list('resumes')
-    rreports = [Markup(f'<a href="/reports/resumes/{report}.xlsx" class="links">{report}</a> <br>')
-            for report in reports]
-    # Render index html page template with our report URLs data
+    # Search text applied to both reports listings
+    search = request.args.get('search', '').strip()
+    # Form current pages of reports listings
+    vreports, vpage, vpages, vtotal = catalogs['vacancies'].page(
+        request.args.get('vpage', 1, type=int), search=search)
+    rreports, rpage, rpages, rtotal = catalogs['resumes'].page(
+        request.args.get('rpage', 1, type=int), search=search)
+    # Render index html page template with our reports pages
     return render_template('index.html',
+                            search=search,
                             vreports=vreports,
-                            rreports=rreports)
+                            vpage=vpage,
+                            vpages=vpages,
+                            vtotal=vtotal,
+                            rreports=rreports,
+                            rpage=rpage,
+                            rpages=rpages,
+                            rtotal=rtotal)
 
 # URL binding
 @app.route("/vacancy", methods=['GET', 'POST'])
@@ -12,7 +12,8 @@ class MailSender:
     Class is designed to send email messages
     ----------------------------------------
     Public methods:
-        send_email()
+        connect()
+        send_email(connection)
     ----------------------------------------
     '''
 
@@ -22,6 +23,8 @@ class MailSender:
     password = mail_creds['password']
     # Its SMTP mail server 
     server = mail_creds['smtp_server']
+    # SMTP session debug output level, 1 prints the whole session
+    debuglevel = 0
 
     def __init__(self, destinations, subject, body):
         # Email message body
@@ -34,16 +37,32 @@ class MailSender:
         self.destinations = destinations
         self.message['To'] = ', '.join(destinations)
 
-    def send_email(self):
-        '''This method forms and sends e-mail message'''
-        # Instantiate mail sender context
-        with SMTP_SSL(MailSender.server) as server:
-            # Enable debug output
-            server.set_debuglevel(1)
+    @classmethod
+    def connect(cls):
+        '''This method opens authenticated SMTP connection,
+        which could be reused for sending of many messages'''
+        connection = SMTP_SSL(cls.server)
+        try:
+            # Debug output
+            connection.set_debuglevel(cls.debuglevel)
             # Some authentication and authorizations
-            server.login(MailSender.source, MailSender.password)
-            # Send email
-            server.sendmail(self.message['From'],
+            connection.login(cls.source, cls.password)
+        except Exception:
+            # Don't leak socket of failed session
+            connection.close()
+            raise
+        return connection
+
+    def send_email(self, connection=None):
+        '''This method forms and sends e-mail message,
+        through given SMTP connection or its own one'''
+        if connection is None:
+            # Instantiate mail sender context
+            with self.connect() as connection:
+                self.send_email(connection)
+            return
+        # Send email
+        connection.sendmail(self.message['From'],
                             self.destinations,
                             self.message.as_string())
 
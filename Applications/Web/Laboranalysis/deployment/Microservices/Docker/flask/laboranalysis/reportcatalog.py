@@ -0,0 +1,155 @@
+
+# Directory walking stuff for xlsx reports listing:
+import os
+# Catalog synchronization between request threads:
+import threading
+
+# Report creation dates:
+from datetime import datetime
+
+
+class ReportCatalog:
+    '''
+    -------------------------------------------------------------
+    Class is designed to keep cached listing of xlsx reports
+      directory with report size, creation time and vacancies
+      amount parsed from '<criteria>-<n>.xlsx' file name.
+    Exports of the same report ('<criteria>-<n>.parquet',
+      '.csv.gz', '.json') are listed as its formats.
+    Directory is listed again only when its mtime or mtime of
+      publish marker (touched by analyze step after report is
+      stored) changes, otherwise listing costs two stat calls
+    -------------------------------------------------------------
+    Public methods:
+        reports()
+        page(number, size, search)
+    -------------------------------------------------------------
+    '''
+
+    # Publish marker file name, touched after report is stored
+    marker = '.published'
+
+    # Amount of reports on one page
+    page_size = 50
+
+    # {file extension : report format}, main format goes first
+    formats = {
+        '.xlsx': 'xlsx',
+        '.parquet': 'parquet',
+        '.csv.gz': 'csv',
+        '.json': 'json',
+    }
+
+    def __init__(self, path):
+        # Directory with xlsx reports
+        self.path = path
+        # Directory and marker mtimes of cached listing
+        self.stamp = None
+        # Cached reports listing
+        self.entries = []
+        self.lock = threading.Lock()
+
+    #--------------------------------------------------------------------------
+    # Directory and publish marker modification times
+    #--------------------------------------------------------------------------
+    def _stamp(self):
+        try:
+            marker = os.stat(os.path.join(self.path,
+                                          ReportCatalog.marker)).st_mtime_ns
+        except FileNotFoundError:
+            marker = None
+        return os.stat(self.path).st_mtime_ns, marker
+
+    #--------------------------------------------------------------------------
+    # Split file name into report name and report format
+    #--------------------------------------------------------------------------
+    def _name_splitter(self, file_name):
+        for extension, format in ReportCatalog.formats.items():
+            if file_name.endswith(extension):
+                return file_name[:-len(extension)], format
+        name, _, extension = file_name.rpartition('.')
+        return (name, extension) if name else (file_name, '')
+
+    #--------------------------------------------------------------------------
+    # Form report info from directory entry
+    #--------------------------------------------------------------------------
+    def _entry(self, file, name):
+        criteria, _, amount = name.rpartition('-')
+        if not (criteria and amount.isdigit()):
+            criteria, amount = name, None
+        stat = file.stat()
+        return {'name': name,
+                'file': file.name,
+                'criteria': criteria,
+                'vacancies': int(amount) if amount is not None else None,
+                'size': stat.st_size,
+                'created': datetime.fromtimestamp(stat.st_ctime),
+                'formats': {}}
+
+    #--------------------------------------------------------------------------
+    # Group directory entries into reports with all formats of each one,
+    # report info is taken from its main format file
+    #--------------------------------------------------------------------------
+    def _reports_grouper(self, files):
+        # Known formats go in 'formats' order, unknown ones after them
+        order = list(ReportCatalog.formats.values())
+        priority = lambda format: (order.index(format)
+                                   if format in order else len(order))
+        reports = {}
+        for file in files:
+            name, format = self._name_splitter(file.name)
+            report = reports.get(name)
+            if report is None or priority(format) < priority(report['format']):
+                formats = report['formats'] if report else {}
+                report = reports[name] = self._entry(file, name)
+                report['format'] = format
+                report['formats'] = formats
+            report['formats'][format] = file.name
+        for report in reports.values():
+            report['formats'] = dict(sorted(report['formats'].items(),
+                                            key=lambda item: priority(item[0])))
+        return list(reports.values())
+
+    def reports(self):
+        '''All reports sorted by name,
+        directory is listed again only if it was changed
+        '''
+        stamp = self._stamp()
+        if stamp != self.stamp:
+            with self.lock:
+                if stamp != self.stamp:
+                    with os.scandir(self.path) as files:
+                        # Hidden files are markers and reports being stored
+                        entries = self._reports_grouper(file
+                            for file in files
+                                if file.is_file()
+                                    and not file.name.startswith('.'))
+                    self.entries = sorted(entries,
+                                          key=lambda entry:
+                                              entry['name'].lower())
+                    self.stamp = stamp
+        return self.entries
+
+    def page(self, number=1, size=None, search=None):
+        '''Reports of page 'number' (starting from 1) with 'size' reports
+        which criteria contains 'search' text (case insensitive),
+        returns (reports, current page number, pages amount, total amount)
+        '''
+        size = size or ReportCatalog.page_size
+        reports = self.reports()
+        if search:
+            search = search.strip().lower()
+            reports = [report
+                for report in reports
+                    if search in report['criteria'].lower()]
+        pages = max((len(reports) + size - 1) // size, 1)
+        number = min(max(int(number), 1), pages)
+        return (reports[(number - 1) * size:number * size],
+                number, pages, len(reports))
+
+
+# Checks importing issue
+if __name__ == "__main__":
+    # List current directory
+    catalog = ReportCatalog('.')
+    print(catalog.page(1, 10))
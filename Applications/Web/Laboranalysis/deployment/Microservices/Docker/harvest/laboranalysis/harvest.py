@@ -11,107 +11,142 @@
 #  This is CONTAINER version, intended for deploying to DOCKER environment!   #
 ###############################################################################
 
-# MongoDB connection stuff:
-from pymongo import MongoClient
+# Shared MongoDB clients:
+from mongoclients import MongoClients
 # Our send mail class:
 from mailsender import MailSender
+# Concurrent orders processing:
+from orderdispatcher import OrderDispatcher
+# Orders waiting stuff:
+from orderqueue import OrderQueue
+# Stored reports reuse:
+from reportcache import ReportCache
 # Application delay to become idle
 from time import sleep
 # Our credentials:
-from credentials import mongo, mail_creds
+from credentials import mongo, mail_creds, store_path
+
+# Shared MongoDB client of this process
+mongodb = MongoClients.get(mongo)
+# Orders queue, this service claims orders with 'harvest' status
+queue = OrderQueue(mongodb.hh_orders['queue'], 'harvest')
+# Reports cache in 'reports' collection of 'hh_orders' database
+cache = ReportCache(mongodb.hh_orders['reports'], store_path)
 
 # Email message subjects
 problem = 'Harvest application ran into an issue'
 success = 'Harvest application completes successfully'
 
-# This function tries to get an orders from MongoDB,
-# and starts data harvest process if any exists.
-def get_orders_from_mongo():
-    # Instantiate MongoDB connection context
-    with MongoClient(mongo) as mongodb:
-        # Connection to 'harvest' collection of 'hh_orders' database
-        collection = mongodb.hh_orders['harvest']
-        # Search for orders
-        orders = list(collection.find({}))
-        # If any exists
-        if orders:
-            for order in orders:
-                # If it's vacancy order
-                if 'occupation' in order.keys():
-                    start_request(order)
-                # If it's resume order
-                else:
-                    start_parse(order)
+# Amount of concurrently harvested occupations (criteria),
+# all harvests share one HH requests budget of the process
+workers = 2
+
+# This function starts data harvest process for given orders
+def process_orders(orders):
+    # If any exists
+    if orders:
+        # Jobs are not waited for, free workers take next orders
+        dispatcher.submit(orders)
 
 # This function changes an harvest order status from staging to complete,
-# by moving an order document from 'harvest' collection to 'analyze' collection
+# by atomic moving of claimed order from 'harvest' status to 'analyze' status
 def change_order_status(order):
-    # Instantiate MongoDB connection context
-    with MongoClient(mongo) as mongodb:
-        # Connection to 'analyze' collection of 'hh_orders' database
-        collection = mongodb.hh_orders['analyze']
-        # Put completed order
-        collection.insert_one(order)
-        # Connection to 'harvest' collection of 'hh_orders' database
-        collection = mongodb.hh_orders['harvest']
-        # Drop completed order
-        collection.delete_one(order)                    
+    queue.complete([order], 'analyze')
+
+# This function fulfills an harvest order by fresh cached report,
+# by atomic moving of claimed order from 'harvest' status to 'notify' status
+def fulfill_order(order, report):
+    queue.complete([order], 'notify', {'report': report})
+
+# This function checks whether harvest changed stored vacancies
+def vacancies_changed(vacancies):
+    store_stats = vacancies.store_stats or {}
+    harvest_stats = vacancies.harvest_stats or {}
+    return bool( store_stats.get('inserted')
+                 or store_stats.get('updated')
+                 or harvest_stats.get('archived') )
 
 # This function makes vacancies retrievement process
-def start_request(order):
-    # Try to make processing on geted order
+# for all orders on the same occupation
+def start_request(orders):
+    # Try to make processing on geted orders
     try:
         # Import our vacancy processing class
         from vacancyhandler import VacancyHandler
-        vacancies = VacancyHandler(order.get('occupation'))
-        # Start retrievement with delay
-        vacancies._vacancies_retriever(delay=10, number=None)
-        vacancies.store_vacancies_to_mongo()
-        change_order_status(order)
+        vacancies = VacancyHandler(orders[0].get('occupation'))
+        key = vacancies.report_key()
+        # Fresh report of the same search fulfills orders at once,
+        # harvest and analysis are skipped
+        report = cache.fresh(key)
+        if report:
+            for order in orders:
+                fulfill_order(order, report)
+        else:
+            # Start concurrent retrievement within common requests budget,
+            # only vacancies new or changed since previous harvest are retrieved
+            vacancies._vacancies_retriever(number=None, incremental=True)
+            vacancies.store_vacancies_to_mongo()
+            # New snapshot version is registered if vacancies were changed
+            cache.harvested(key, vacancies_changed(vacancies))
+            for order in orders:
+                change_order_status(order)
     # If run into an issue, notificates application admin
     except:
+        # Claim them again later
+        queue.release(orders)
         mail = MailSender( [mail_creds['admin']], 
                             problem,
-                            str(order) )
+                            str(orders) )
         mail.send_email()
     # If completes successfully, notificates application admin
     mail = MailSender( [mail_creds['admin']],
                         success, 
-                        order.get('occupation') )
+                        orders[0].get('occupation') )
     mail.send_email()
 
 # This function makes resume retrievement process
-def start_parse(order):
-    # Try to make processing on geted order
+# for all orders on the same criteria
+def start_parse(orders):
+    # Try to make processing on geted orders
     try:
         # Import our vacancy processing class
         from resumehandler import ResumeHandler
-        resumes = ResumeHandler(order.get('criteria'))
+        resumes = ResumeHandler(orders[0].get('criteria'))
         # Start retrievement with delay
         resumes._resumes_retriever(delay=30, number=None)
         resumes.store_resumes_to_mongo()
-        change_order_status(order)
+        for order in orders:
+            change_order_status(order)
     # If run into an issue, notificates application admin
     except:
+        # Claim them again later
+        queue.release(orders)
         mail = MailSender( [mail_creds['admin']], 
                             problem, 
-                            str(order) )
+                            str(orders) )
         mail.send_email()        
     # If completes successfully, notificates application admin
     mail = MailSender( [mail_creds['admin']],
                         success, 
-                        order.get('criteria') )
+                        orders[0].get('criteria') )
     mail.send_email()
 
 
+# Orders on the same occupation (criteria) are harvested once
+# by persistent pool of 'workers'
+dispatcher = OrderDispatcher({'occupation': start_request,
+                              'criteria': start_parse},
+                             workers)
+
+
 # Checks importing issue
 if __name__ == "__main__":
-    # Endless loop
-    while True:
-        # Buffer start interval
-        sleep(10)
-        # Checks for new orders
-        get_orders_from_mongo()
-        # Go to bed for 1 hour
-        sleep(3600)        
+    # Buffer start interval
+    sleep(10)
+    # Orders left in former 'harvest' collection are moved to the queue
+    queue.migrate(mongodb.hh_orders['harvest'])
+    # Endless loop, wakes up as soon as new orders are put
+    # and claims one job as soon as a worker is free
+    for orders in queue.batches(ready=dispatcher.wait_worker):
+        process_orders(orders)
     
\ No newline at end of file
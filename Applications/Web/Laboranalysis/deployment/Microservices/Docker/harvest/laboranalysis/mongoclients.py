@@ -0,0 +1,105 @@
+
+# Process id for fork detection:
+import os
+# Registry synchronization:
+import threading
+
+# MongoDB connection stuff:
+from pymongo import MongoClient
+# MongoDB errors:
+from pymongo.errors import PyMongoError
+
+
+class MongoClients:
+    '''
+    -------------------------------------------------------------
+    Class is designed to keep one MongoDB client (with its own
+      connections pool) per connection string for whole process,
+      so server discovery, handshakes and pool creation are paid
+      once instead of every request.
+    Registry is fork-safe: forked process (e.g. gunicorn worker)
+      never uses clients inherited from its parent process and
+      creates its own ones
+    -------------------------------------------------------------
+    Public methods:
+        get(uri, **options)
+        ping(uri)
+        close()
+    -------------------------------------------------------------
+    '''
+
+    # Maximal amount of connections in every client pool
+    max_pool_size = 50
+
+    # Amount of connections kept open in every client pool
+    min_pool_size = 0
+
+    # Server selection timeout in milliseconds
+    timeout = 5000
+
+    # {connection string : client} of the current process
+    clients = {}
+
+    # Id of the process which created clients
+    pid = os.getpid()
+
+    lock = threading.Lock()
+
+    #--------------------------------------------------------------------------
+    # Forget clients inherited from parent process
+    #--------------------------------------------------------------------------
+    @classmethod
+    def _fork_checker(cls):
+        if cls.pid != os.getpid():
+            # Inherited sockets belong to parent process, so inherited
+            # clients are dropped without closing
+            cls.clients = {}
+            cls.pid = os.getpid()
+            cls.lock = threading.Lock()
+
+    @classmethod
+    def get(cls, uri, **options):
+        '''Shared client for the connection string,
+        'options' are used only when the client is created
+        '''
+        cls._fork_checker()
+        client = cls.clients.get(uri)
+        if client is not None:
+            return client
+        with cls.lock:
+            client = cls.clients.get(uri)
+            if client is None:
+                options.setdefault('maxPoolSize', cls.max_pool_size)
+                options.setdefault('minPoolSize', cls.min_pool_size)
+                options.setdefault('serverSelectionTimeoutMS', cls.timeout)
+                # Connection is established on first operation,
+                # so client could be created before fork
+                options.setdefault('connect', False)
+                client = cls.clients[uri] = MongoClient(uri, **options)
+        return client
+
+    @classmethod
+    def ping(cls, uri):
+        '''Check that MongoDB server is reachable, True if it is
+        '''
+        try:
+            cls.get(uri).admin.command('ping')
+            return True
+        except PyMongoError:
+            return False
+
+    @classmethod
+    def close(cls):
+        '''Close all clients of the current process
+        '''
+        cls._fork_checker()
+        with cls.lock:
+            for client in cls.clients.values():
+                client.close()
+            cls.clients = {}
+
+
+# Checks importing issue
+if __name__ == "__main__":
+    # Check test connection
+    print(MongoClients.ping('mongodb://127.0.0.1:27017'))
@@ -0,0 +1,108 @@
+# Concurrent jobs stuff:
+from concurrent.futures import ThreadPoolExecutor
+# Workers occupancy tracking:
+import threading
+
+
+class OrderDispatcher:
+    '''
+    -------------------------------------------------------------
+    Class is designed to process pending orders concurrently:
+      orders of the same kind and subject (e.g. the same
+      occupation) are merged into one job, jobs are run by
+      limited amount of workers of persistent pool.
+    Jobs are submitted as soon as orders arrive, so one slow
+      job doesn't hold other workers idle
+    -------------------------------------------------------------
+    Public methods:
+        jobs(orders)
+        submit(orders)
+        wait_worker()
+        dispatch(orders)
+        shutdown(wait)
+    -------------------------------------------------------------
+    '''
+
+    def __init__(self, handlers, workers=1):
+        # {order subject field : job handler}, e.g. {'occupation': handler},
+        # handler gets list of all orders merged into the job
+        self.handlers = handlers
+        # Amount of concurrently processed jobs
+        self.workers = max(int(workers), 1)
+        # Workers pool living as long as dispatcher
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        # Amount of submitted and not completed jobs
+        self.running = 0
+        self.condition = threading.Condition()
+
+    def jobs(self, orders):
+        '''Merge orders into jobs {(subject field, subject) : orders}
+        keeping orders arrival order, orders without handled
+        subject field are skipped
+        '''
+        jobs = {}
+        for order in orders:
+            for field in self.handlers:
+                if field in order.keys():
+                    jobs.setdefault((field, order.get(field)), []).append(order)
+                    break
+        return jobs
+
+    #--------------------------------------------------------------------------
+    # Run job handler and free its worker
+    #--------------------------------------------------------------------------
+    def _job_runner(self, handler, orders):
+        try:
+            return handler(orders)
+        finally:
+            with self.condition:
+                self.running -= 1
+                self.condition.notify_all()
+
+    def submit(self, orders):
+        '''Merge orders into jobs and submit them to workers pool
+        without waiting for them, returns jobs futures
+        '''
+        futures = []
+        for (field, subject), job_orders in self.jobs(orders).items():
+            with self.condition:
+                self.running += 1
+            futures.append(self.executor.submit(self._job_runner,
+                                                self.handlers[field],
+                                                job_orders))
+        return futures
+
+    def wait_worker(self):
+        '''Wait until at least one worker is free
+        '''
+        with self.condition:
+            self.condition.wait_for(lambda: self.running < self.workers)
+
+    def dispatch(self, orders):
+        '''Process all orders merged into jobs with limited concurrency,
+        waits until all jobs are completed, returns amount of jobs
+        '''
+        futures = self.submit(orders)
+        # Wait for all jobs
+        for future in futures:
+            future.exception()
+        # Raise unhandled job issue if any
+        for future in futures:
+            future.result()
+        return len(futures)
+
+    def shutdown(self, wait=True):
+        '''Stop workers pool, 'wait' for submitted jobs
+        '''
+        self.executor.shutdown(wait=wait)
+
+
+# Checks importing issue
+if __name__ == "__main__":
+    # Dispatch test orders
+    dispatcher = OrderDispatcher({'occupation': print, 'criteria': print},
+                                 workers=2)
+    dispatcher.dispatch([{'occupation': 'Python'},
+                         {'criteria': 'Python'},
+                         {'occupation': 'Python'}])
+    dispatcher.shutdown()
@@ -0,0 +1,50 @@
+
+# Delay function:
+import time
+# Threads synchronization:
+import threading
+
+
+class RateLimiter:
+    '''
+    -------------------------------------------------------------
+    Class is designed to share requests budget (requests per
+      second) between all threads of the process: every request
+      reserves the nearest free time slot, slots are 1/rate
+      seconds apart, so concurrent retrievements together never
+      exceed the budget
+    -------------------------------------------------------------
+    Public methods:
+        wait()
+    -------------------------------------------------------------
+    '''
+
+    def __init__(self, rate):
+        # Minimal interval between two requests starts,
+        # without budget requests go as fast as they can
+        self.interval = 1 / float(rate) if rate else 0
+        # Time of the nearest free request slot
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        '''Hold the caller until its turn in requests budget comes
+        '''
+        if not self.interval:
+            return
+        with self.lock:
+            # Reserve the nearest free time slot
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(slot - now)
+
+
+# Checks importing issue
+if __name__ == "__main__":
+    # Five requests within 2 requests per second budget take 2 seconds
+    limiter = RateLimiter(2)
+    start = time.monotonic()
+    for request in range(5):
+        limiter.wait()
+    print(round(time.monotonic() - start, 1))
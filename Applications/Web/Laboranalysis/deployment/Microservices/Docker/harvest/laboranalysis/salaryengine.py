@@ -0,0 +1,106 @@
+
+# Vectorized calculations:
+import numpy
+
+
+class SalaryEngine:
+    '''
+    -------------------------------------------------------------
+    Class is designed to calculate salary statistics over salary
+      arrays: net salaries, salary groups histogram and average,
+      median, modal salaries for all and for every region
+    -------------------------------------------------------------
+    Public methods:
+        calculate(salaries)
+    -------------------------------------------------------------
+    '''
+
+    # Gross (before taxes) to net salary factor
+    net_factor = 0.87
+
+    # Salary groups bin edges
+    edges = (20000, 30000, 40000, 50000, 60000, 70000, 90000)
+
+    def __init__(self, edges=None, currency='RUR'):
+        # Salary groups bin edges
+        self.edges = numpy.array(sorted(edges or SalaryEngine.edges))
+        # Only salaries in this currency are calculated
+        self.currency = currency
+        # Salary groups names: 'Менее 20000', '20000-30000' ... 'Более 90000'
+        self.labels = ([f'Менее {self.edges[0]}']
+                       + [f'{low}-{high}'
+                          for low, high in zip(self.edges, self.edges[1:])]
+                       + [f'Более {self.edges[-1]}'])
+
+    #--------------------------------------------------------------------------
+    # Modal salary group: the last one among the most frequent groups
+    #--------------------------------------------------------------------------
+    def _modal_group(self, groups_counts):
+        return self.labels[len(groups_counts) - 1
+                           - int(numpy.argmax(groups_counts[::-1]))]
+
+    def calculate(self, salaries):
+        '''Calculate salary statistics from salary arrays:
+        'region' codes, 'regions' names, 'currency', 'gross' flags,
+        'from' and 'to' bounds (NaN if not specified)
+        '''
+        regions = salaries['regions']
+        regions_amount = len(regions)
+        groups_amount = len(self.labels)
+
+        # Both salary bounds of every vacancy, converted to net salary
+        bounds = numpy.column_stack((salaries['from'], salaries['to']))
+        bounds = numpy.where(salaries['gross'][:, None],
+                             bounds * SalaryEngine.net_factor,
+                             bounds)
+        # Specified bounds of salaries in appropriate currency
+        valid = ((salaries['currency'] == self.currency)[:, None]
+                 & ~numpy.isnan(bounds)
+                 & (bounds != 0))
+        values = bounds[valid]
+        values_regions = numpy.broadcast_to(salaries['region'][:, None],
+                                            bounds.shape)[valid]
+
+        # Salary groups of all salaries
+        groups = numpy.searchsorted(self.edges, numpy.trunc(values),
+                                    side='right')
+        groups_counts = numpy.bincount(groups, minlength=groups_amount)
+
+        # Salaries sorted by value inside every region
+        order = numpy.lexsort((values, values_regions))
+        sorted_values = values[order]
+        # Salaries amount, sum and first salary position of every region
+        totals = numpy.bincount(values_regions, minlength=regions_amount)
+        sums = numpy.bincount(values_regions, weights=values,
+                              minlength=regions_amount)
+        starts = numpy.cumsum(totals) - totals
+        # Salary groups histogram of every region
+        regions_groups_counts = numpy.bincount(
+            values_regions * groups_amount + groups,
+            minlength=regions_amount * groups_amount
+        ).reshape(regions_amount, groups_amount)
+
+        salaries_by_region = {}
+        for code, region in enumerate(regions):
+            total = int(totals[code])
+            start = int(starts[code])
+            region_values = sorted_values[start:start + total]
+            salaries_by_region[region] = {
+                'average_salary': round(sums[code] / total) if total else 0,
+                'median_salary': (float((region_values[(total - 1) // 2]
+                                         + region_values[total // 2]) / 2)
+                                  if total else 0),
+                'modal_salary': (self._modal_group(regions_groups_counts[code])
+                                 if total else 0),
+                'sum': float(sums[code]),
+                'total': total,
+                'salary_all': region_values.tolist(),
+            }
+
+        return {
+            'average_salary': round(values.sum() / len(values)) if len(values) else 0,
+            'median_salary': float(numpy.median(values)) if len(values) else 0,
+            'modal_salary': self._modal_group(groups_counts),
+            'salary_groups': dict(zip(self.labels, groups_counts.tolist())),
+            'salaries_by_region': salaries_by_region,
+        }
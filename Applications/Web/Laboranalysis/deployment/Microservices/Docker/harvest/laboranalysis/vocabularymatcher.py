@@ -0,0 +1,115 @@
+
+# Breadth-first automaton links building:
+from collections import deque
+
+
+class VocabularyMatcher:
+    '''
+    -------------------------------------------------------------
+    Class is designed to find all vocabulary criteria in texts
+      in a single pass over every text: Aho–Corasick automaton
+      (trie of all criteria with failure links) is compiled once
+      from {group : criteria} vocabulary, so matching cost does
+      not grow with vocabulary size.
+    Criteria are matched as substrings (case sensitive),
+      overlapping ones are found too
+    -------------------------------------------------------------
+    Public methods:
+        match(text)
+        tag(texts)
+        groups(criteria)
+    -------------------------------------------------------------
+    '''
+
+    def __init__(self, vocabulary):
+        # {group : criteria}
+        self.vocabulary = vocabulary
+        # {criteria : groups} of all criteria
+        self.criteria = {}
+        for group, group_criteria in vocabulary.items():
+            for criteria in group_criteria:
+                self.criteria.setdefault(criteria, []).append(group)
+
+        # Automaton states: transitions, failure links and
+        # criteria ending in the state (with ones of its failure links)
+        self.transitions = [{}]
+        self.failures = [0]
+        self.outputs = [()]
+        self._trie_builder()
+        self._links_builder()
+
+    #--------------------------------------------------------------------------
+    # Trie of all criteria
+    #--------------------------------------------------------------------------
+    def _trie_builder(self):
+        for criteria in self.criteria:
+            state = 0
+            for char in criteria:
+                following = self.transitions[state].get(char)
+                if following is None:
+                    following = len(self.transitions)
+                    self.transitions[state][char] = following
+                    self.transitions.append({})
+                    self.failures.append(0)
+                    self.outputs.append(())
+                state = following
+            self.outputs[state] += (criteria,)
+
+    #--------------------------------------------------------------------------
+    # Failure links: the longest proper suffix of state path
+    # which is a trie path too, found breadth-first
+    #--------------------------------------------------------------------------
+    def _links_builder(self):
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self.transitions[state].items():
+                queue.append(following)
+                failure = self.failures[state]
+                while failure and char not in self.transitions[failure]:
+                    failure = self.failures[failure]
+                failure = self.transitions[failure].get(char, 0)
+                self.failures[following] = (failure
+                                            if failure != following else 0)
+                self.outputs[following] += self.outputs[failure]
+
+    def match(self, text):
+        '''Set of all criteria found in 'text'
+        '''
+        transitions = self.transitions
+        failures = self.failures
+        outputs = self.outputs
+        found = set()
+        state = 0
+        for char in text:
+            following = transitions[state].get(char)
+            while following is None and state:
+                state = failures[state]
+                following = transitions[state].get(char)
+            state = following or 0
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def tag(self, texts):
+        '''{criteria : texts indices} of all criteria found
+        in 'texts', indices go in texts order
+        '''
+        tags = {}
+        for index, text in enumerate(texts):
+            for criteria in self.match(text):
+                tags.setdefault(criteria, []).append(index)
+        return tags
+
+    def groups(self, criteria):
+        '''Vocabulary groups of 'criteria'
+        '''
+        return self.criteria.get(criteria, [])
+
+
+# Checks importing issue
+if __name__ == "__main__":
+    # Match test text
+    from filtervocabulary import vocabulary
+    matcher = VocabularyMatcher(vocabulary)
+    print(matcher.match('знание agile, командное лидерство и честность'))
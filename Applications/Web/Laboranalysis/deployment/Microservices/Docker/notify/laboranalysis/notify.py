@@ -13,19 +13,34 @@
 
 # Directory walking stuff for xlsx reports listing:
 import os
-# MongoDB connection stuff:
-from pymongo import MongoClient
-# Our send mail class:
-from mailsender import MailSender
+# Shared MongoDB clients:
+from mongoclients import MongoClients
+# Our background mail outbox:
+from mailoutbox import MailOutbox
+# Concurrent orders processing:
+from orderdispatcher import OrderDispatcher
+# Orders waiting stuff:
+from orderqueue import OrderQueue
 # Application delay to become idle
 from time import sleep
 # Our credentials:
 from credentials import mongo, mail_creds, store_path
 
+# Shared MongoDB client of this process
+mongodb = MongoClients.get(mongo)
+# Orders queue, this service claims orders with 'notify' status
+queue = OrderQueue(mongodb.hh_orders['queue'], 'notify')
+
+# Mail outbox in 'outbox' collection of 'hh_mail' database
+outbox = MailOutbox(mongodb.hh_mail['outbox'])
+
 # Email message subjects
 problem = 'Notify application ran into an issue'
 success = 'Заказанный вами отчёт готов!'
 
+# Amount of concurrently notified occupations (criteria)
+workers = 4
+
 # This function forms list of xlsx report files from 'store_path' directory.
 def get_reports_list(report_type):
     # Forms path to directory with xlsx reports
@@ -37,65 +52,67 @@ def get_reports_list(report_type):
     return reports
 
 # This function changes an notify order status from staging to complete,
-# by moving an order document from 'notify' collection to 'complete' collection
+# by atomic moving of claimed order from 'notify' status to 'complete' status
 def change_order_status(order):
-    # Instantiate MongoDB connection context
-    with MongoClient(mongo) as mongodb:
-        # Connection to 'complete' collection of 'hh_orders' database
-        collection = mongodb.hh_orders['complete']
-        # Put completed order
-        collection.insert_one(order)
-        # Connection to 'notify' collection of 'hh_orders' database
-        collection = mongodb.hh_orders['notify']
-        # Drop completed order
-        collection.delete_one(order)
+    queue.complete([order], 'complete')
+
+# This function checks whether report of an order is ready
+def report_ready(order, field, reports):
+    # Report path is kept in order by analyze service (or harvest service
+    # when cached report is reused)
+    if order.get('report'):
+        return os.path.isfile(os.path.join(store_path, order.get('report')))
+    # Otherwise report name is '<subject>-<amount>' or just '<subject>'
+    subject = order.get(field)
+    return any(report == subject or report.rpartition('-')[0] == subject
+        for report in reports)
 
-# This function tries to get an orders from MongoDB,
-# and notifies application admin and customer if any exists.
-def get_orders_from_mongo():
-    # Instantiate MongoDB connection context
-    with MongoClient(mongo) as mongodb:
-        # Connection to 'notify' collection of 'hh_orders' database
-        collection = mongodb.hh_orders['notify']
-        # Search for orders
-        orders = list(collection.find({}))
-        # Lists content of vacancies directory
-        vacancies = get_reports_list('vacancies')
-        # Lists content of resumes directory
-        resumes = get_reports_list('resumes')
+# This function notifies application admin and every customer
+# of orders on the same subject, if its report is ready
+def notify_customers(orders, field, reports):
+    waiting = []
+    for order in orders:
+        # If report is ready
+        if report_ready(order, field, reports):
+            # Notificates application admin and order customer
+            order_customer = order.get('customer')
+            outbox.put( [mail_creds['admin'], order_customer],
+                         success,
+                         order.get(field) )
+            change_order_status(order)
+        else:
+            waiting.append(order)
+    if waiting:
+        # Check it again in 5 minutes
+        queue.release(waiting, delay=300)
 
-        if orders:
-            for order in orders:
-                # If it's vacancy order
-                if order.get('occupation') in vacancies and 'occupation' in order.keys():
-                    # If completes successfully,
-                    # notificates application admin and order customer
-                    order_customer = order.get('customer')
-                    mail = MailSender( [mail_creds['admin'], order_customer],
-                                        success, 
-                                        order.get('occupation') )
-                    mail.send_email()
-                    change_order_status(order)
+# This function notifies application admin and customers of given orders
+def process_orders(orders):
+    if orders:
+        # Jobs are not waited for, free workers take next orders
+        dispatcher.submit(orders)
 
-                # If it's resume order
-                if order.get('criteria') in resumes and 'criteria' in order.keys():
-                    # If completes successfully,
-                    # notificates application admin and order customer
-                    order_customer = order.get('customer')
-                    mail = MailSender( [mail_creds['admin'], order_customer],
-                                        success, 
-                                        order.get('criteria') )
-                    mail.send_email()
-                    change_order_status(order)
+# Customers of orders on the same occupation (criteria) are notified
+# by one job of persistent pool of 'workers', every job lists content
+# of vacancies (resumes) directory
+dispatcher = OrderDispatcher(
+    {'occupation': lambda orders:
+         notify_customers(orders, 'occupation', get_reports_list('vacancies')),
+     'criteria': lambda orders:
+         notify_customers(orders, 'criteria', get_reports_list('resumes'))},
+    workers)
 
 
 # Checks importing issue
 if __name__ == "__main__":
-    # Endless loop
-    while True:
-        # Buffer start interval
-        sleep(10)
-        # Checks for new orders
-        get_orders_from_mongo()
-        # Go to bed for 1 hour
-        sleep(3600)
+    # Buffer start interval
+    sleep(10)
+    # Orders left in former 'notify' collection are moved to the queue
+    queue.migrate(mongodb.hh_orders['notify'])
+    # Send messages put to outbox by web application and by us
+    # in background as soon as they are put
+    outbox.start()
+    # Endless loop, wakes up as soon as new orders are put
+    # and claims one job as soon as a worker is free
+    for orders in queue.batches(ready=dispatcher.wait_worker):
+        process_orders(orders)
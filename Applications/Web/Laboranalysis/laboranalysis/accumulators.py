@@ -0,0 +1,98 @@
+
+# Some data structures:
+import collections
+
+# HTML parser:
+from bs4 import BeautifulSoup
+
+# Descriptions token streams:
+from tokenizer import Tokenizer
+
+
+class DescriptionsAccumulator:
+    '''
+    -------------------------------------------------------------
+    Class is designed to parse every vacancy description once
+      and accumulate everything extractors need from it:
+      english words, <p>/<li> contents with their words and
+      <strong> sections. Texts are split by given tokenizer,
+      shared default one splits them without stop words and
+      lemmatization.
+    Descriptions are not kept, so vacancies could be fed one by
+      one; accumulators of vacancies parts could be merged.
+      Everything is counted by unique content, so memory grows
+      with amount of distinct elements, not of vacancies
+    -------------------------------------------------------------
+    Public methods:
+        add(description)
+        merge(other)
+    -------------------------------------------------------------
+    '''
+
+    # Tokenizer shared by all accumulators
+    tokenizer = Tokenizer()
+
+    def __init__(self, html_parser='html.parser', tokenizer=None):
+        # BeautifulSoup parser backend
+        self.html_parser = html_parser
+        # Descriptions texts tokenizer
+        self.tokenizer = tokenizer or DescriptionsAccumulator.tokenizer
+        # Amount of accumulated descriptions
+        self.amount = 0
+        # {english word : number of entries}
+        self.keywords = collections.Counter()
+        # {unique <p> and <li> content : its words} in first entry order
+        self.elements = {}
+        # {cleaned russian section heading : number of entries}
+        self.strongs = collections.Counter()
+        # {(section heading, <li> item following it) : number of entries}
+        # in first entry order
+        self.sections = collections.Counter()
+
+    def __len__(self):
+        return self.amount
+
+    def add(self, description):
+        '''Parse vacancy description in single tree walk and accumulate it
+        '''
+        soup = BeautifulSoup(description, self.html_parser)
+
+        # Extract only english words
+        self.keywords.update(self.tokenizer.latin(soup.get_text()))
+
+        for tag in soup.findAll(['p', 'li', 'strong']):
+            if tag.name != 'strong':
+                element = tag.text.strip().lower()
+                # Every unique element is split into words once
+                if element not in self.elements:
+                    self.elements[element] = self.tokenizer.words(element)
+                continue
+
+            # Drop english text and excess spaces
+            strong = self.tokenizer.heading(tag.text)
+            if strong:
+                self.strongs[strong] += 1
+
+            # Element following the section heading
+            following = tag.findNext()
+            try:
+                items = [item.text
+                    for item in following.findAll('li')]
+            except AttributeError:
+                # Section is not followed by any element
+                continue
+            self.sections.update((tag.text, item)
+                for item in items)
+
+        self.amount += 1
+
+    def merge(self, other):
+        '''Add accumulated content of other accumulator,
+        merging in vacancies order keeps the first entry order
+        '''
+        self.amount += other.amount
+        self.keywords.update(other.keywords)
+        for element, words in other.elements.items():
+            self.elements.setdefault(element, words)
+        self.strongs.update(other.strongs)
+        self.sections.update(other.sections)
@@ -0,0 +1,304 @@
+
+# Background delivery stuff:
+import threading
+# SMTP errors:
+import smtplib
+
+# Delivery time stamps:
+from datetime import datetime, timedelta
+
+# MongoDB stuff:
+from pymongo import ASCENDING, ReturnDocument
+
+# Our send mail class:
+from mailsender import MailSender
+
+
+class MailOutbox:
+    '''
+    -------------------------------------------------------------
+    Class is designed to send email messages in background:
+      messages are put to outbox (MongoDB collection or memory)
+      instantly and are delivered by worker in batches through
+      one authenticated SMTP connection per batch.
+    Failed messages are retried with exponential backoff,
+      undeliverable ones are left in outbox as dead letters:
+      permanently rejected (5xx) at once, temporarily rejected
+      after 'max_attempts'. Unavailable mail server is waited
+      for with capped backoff, attempts are not counted then
+    -------------------------------------------------------------
+    Public methods:
+        put(destinations, subject, body)
+        deliver()
+        dead_letters()
+        redrive()
+        start(interval)
+    -------------------------------------------------------------
+    '''
+
+    # Amount of delivery attempts before message becomes dead letter
+    max_attempts = 5
+
+    # First retry delay in seconds, doubles with every attempt
+    backoff = 60
+
+    # Retry delay limit in seconds
+    max_backoff = 3600
+
+    # Amount of messages sent through one SMTP connection
+    batch_size = 50
+
+    # Seconds after which message of crashed worker is sent again
+    lease = 600
+
+    # Collections with already ensured indexes in this process
+    indexed = set()
+
+    def __init__(self, collection=None):
+        # MongoDB outbox collection, messages are kept in memory without it
+        self.collection = collection
+        # In memory outbox
+        self.messages = []
+        self.lock = threading.Lock()
+        # Wakes up background worker when message is put
+        self.wakeup = threading.Event()
+        # Background worker thread
+        self.worker = None
+        # Consecutive deliveries which found mail server unavailable
+        self.outages = 0
+
+    #--------------------------------------------------------------------------
+    # Create index for due messages lookup
+    #--------------------------------------------------------------------------
+    def _indexes_creator(self):
+        if self.collection is None:
+            return
+        name = self.collection.full_name
+        if name not in MailOutbox.indexed:
+            self.collection.create_index([('status', ASCENDING),
+                                          ('next_attempt', ASCENDING)])
+            MailOutbox.indexed.add(name)
+
+    def put(self, destinations, subject, body):
+        '''Put message to outbox, it's sent by worker
+        '''
+        message = {'destinations': list(destinations),
+                   'subject': subject,
+                   'body': body,
+                   'status': 'pending',
+                   'attempts': 0,
+                   'next_attempt': datetime.utcnow()}
+        if self.collection is not None:
+            self._indexes_creator()
+            self.collection.insert_one(message)
+        else:
+            with self.lock:
+                self.messages.append(message)
+        self.wakeup.set()
+
+    #--------------------------------------------------------------------------
+    # Claim one due message: pending one with passed retry time
+    # or one which was taken by crashed worker long ago
+    #--------------------------------------------------------------------------
+    def _claim(self, now):
+        if self.collection is not None:
+            return self.collection.find_one_and_update(
+                {'$or': [{'status': 'pending',
+                          'next_attempt': {'$lte': now}},
+                         {'status': 'sending',
+                          'claimed_at': {'$lt': now - timedelta(
+                              seconds=MailOutbox.lease)}}]},
+                {'$set': {'status': 'sending', 'claimed_at': now}},
+                sort=[('next_attempt', ASCENDING)],
+                return_document=ReturnDocument.AFTER)
+        with self.lock:
+            for message in self.messages:
+                if (message['status'] == 'pending'
+                        and message['next_attempt'] <= now):
+                    message['status'] = 'sending'
+                    return message
+        return None
+
+    #--------------------------------------------------------------------------
+    # Drop delivered message from outbox
+    #--------------------------------------------------------------------------
+    def _sent(self, message):
+        if self.collection is not None:
+            self.collection.delete_one({'_id': message['_id']})
+        else:
+            with self.lock:
+                self.messages = [kept
+                    for kept in self.messages
+                        if kept is not message]
+
+    #--------------------------------------------------------------------------
+    # Set 'update' fields to message
+    #--------------------------------------------------------------------------
+    def _updater(self, message, update):
+        if self.collection is not None:
+            self.collection.update_one({'_id': message['_id']},
+                                       {'$set': update})
+        else:
+            with self.lock:
+                message.update(update)
+
+    #--------------------------------------------------------------------------
+    # Message is rejected for good: all recipients refused or 5xx reply
+    #--------------------------------------------------------------------------
+    @staticmethod
+    def _permanent(error):
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            codes = [code
+                for code, text in error.recipients.values()]
+            return bool(codes) and all(code >= 500 for code in codes)
+        if isinstance(error, smtplib.SMTPResponseException):
+            return error.smtp_code >= 500
+        return False
+
+    #--------------------------------------------------------------------------
+    # Mail server can't be reached or closes session (421 reply)
+    #--------------------------------------------------------------------------
+    @staticmethod
+    def _unavailable(error):
+        if isinstance(error, smtplib.SMTPServerDisconnected):
+            return True
+        if isinstance(error, smtplib.SMTPResponseException):
+            return error.smtp_code == 421
+        # SMTP errors are OSError too, but only socket errors are left
+        return (isinstance(error, OSError)
+                and not isinstance(error, smtplib.SMTPException))
+
+    #--------------------------------------------------------------------------
+    # Schedule retry of failed message or make it dead letter
+    #--------------------------------------------------------------------------
+    def _failed(self, message, error):
+        attempts = message['attempts'] + 1
+        if self._permanent(error) or attempts >= MailOutbox.max_attempts:
+            update = {'status': 'dead'}
+        else:
+            delay = min(MailOutbox.backoff * 2 ** (attempts - 1),
+                        MailOutbox.max_backoff)
+            update = {'status': 'pending',
+                      'next_attempt': (datetime.utcnow()
+                                       + timedelta(seconds=delay))}
+        update.update(attempts=attempts, error=str(error))
+        self._updater(message, update)
+
+    #--------------------------------------------------------------------------
+    # Retry messages later while mail server is unavailable,
+    # delay grows with consecutive outages, attempts are not counted
+    #--------------------------------------------------------------------------
+    def _postponed(self, messages, error):
+        self.outages += 1
+        delay = min(MailOutbox.backoff * 2 ** (self.outages - 1),
+                    MailOutbox.max_backoff)
+        update = {'status': 'pending',
+                  'next_attempt': datetime.utcnow() + timedelta(seconds=delay),
+                  'error': str(error)}
+        for message in messages:
+            self._updater(message, dict(update))
+
+    def deliver(self):
+        '''Send all due messages in batches, one SMTP connection
+        per batch, returns amount of sent messages
+        '''
+        self._indexes_creator()
+        sent = 0
+        while True:
+            now = datetime.utcnow()
+            batch = []
+            while len(batch) < MailOutbox.batch_size:
+                message = self._claim(now)
+                if message is None:
+                    break
+                batch.append(message)
+            if not batch:
+                return sent
+
+            try:
+                connection = MailSender.connect()
+            except (smtplib.SMTPException, OSError) as error:
+                # Mail server is unavailable, retry whole batch later
+                self._postponed(batch, error)
+                return sent
+            self.outages = 0
+
+            with connection:
+                for position, message in enumerate(batch):
+                    mail = MailSender(message['destinations'],
+                                      message['subject'],
+                                      message['body'])
+                    try:
+                        mail.send_email(connection)
+                    except (smtplib.SMTPException, OSError) as error:
+                        if self._unavailable(error):
+                            # Connection is lost, retry rest of batch later
+                            self._postponed(batch[position:], error)
+                            return sent
+                        self._failed(message, error)
+                    else:
+                        self._sent(message)
+                        sent += 1
+
+    def dead_letters(self):
+        '''Undeliverable messages
+        '''
+        if self.collection is not None:
+            return list(self.collection.find({'status': 'dead'}))
+        with self.lock:
+            return [message
+                for message in self.messages
+                    if message['status'] == 'dead']
+
+    def redrive(self):
+        '''Put dead letters back to delivery with attempts reset,
+        returns amount of them
+        '''
+        update = {'status': 'pending',
+                  'attempts': 0,
+                  'next_attempt': datetime.utcnow()}
+        if self.collection is not None:
+            redriven = self.collection.update_many({'status': 'dead'},
+                                                   {'$set': update})
+            amount = redriven.modified_count
+        else:
+            with self.lock:
+                dead = [message
+                    for message in self.messages
+                        if message['status'] == 'dead']
+                for message in dead:
+                    message.update(update)
+            amount = len(dead)
+        self.wakeup.set()
+        return amount
+
+    #--------------------------------------------------------------------------
+    # Deliver messages as soon as they are put, recheck every 'interval'
+    #--------------------------------------------------------------------------
+    def _deliverer(self, interval):
+        while True:
+            self.wakeup.clear()
+            try:
+                self.deliver()
+            except Exception:
+                # Outbox storage issue, try again later
+                pass
+            self.wakeup.wait(interval)
+
+    def start(self, interval=30):
+        '''Start background delivery worker (once)
+        '''
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._deliverer,
+                                               args=(interval,),
+                                               daemon=True)
+                self.worker.start()
+
+
+# Checks importing issue
+if __name__ == "__main__":
+    # Send test email through in memory outbox
+    outbox = MailOutbox()
+    outbox.put([MailSender.source,], 'Тестовое сообщение', 'Ответ не требуется')
+    print(outbox.deliver(), outbox.dead_letters())
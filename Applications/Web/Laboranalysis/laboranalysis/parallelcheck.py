@@ -0,0 +1,87 @@
+
+# Random but fixed data:
+import random
+
+# Analyzed class:
+from vacancyhandler import VacancyHandler
+
+
+# Results compared between serial and parallel analysis
+results = ['skills_all', 'keywords_all', 'experience', 'profareas',
+           'specializations', 'dates', 'regions', 'employers_full',
+           'unique', 'duplicates', 'description_sections',
+           'description_elements_all', 'description_elements',
+           'wordbags_all', 'wordbags', 'salaries', 'salary_groups',
+           'salaries_by_region']
+
+
+#------------------------------------------------------------------------------
+# Fixed vacancies batch, the same on every call
+#------------------------------------------------------------------------------
+def fixed_vacancies(amount=300):
+    generator = random.Random(0)
+    areas = ['Москва', 'Санкт-Петербург', 'Новосибирск', 'Томск']
+    skills = ['Python', 'SQL', 'Git', 'Linux', 'Docker', 'Django']
+    words = ('знание опыт работы python sql linux docker agile '
+             'ответственность коммуникабельность лидерство').split()
+    for number in range(amount):
+        description = ''.join(
+            f'<p><strong>{heading}</strong></p><ul>'
+            + ''.join(f'<li>{" ".join(generator.sample(words, 4))}.</li>'
+                for item in range(generator.randint(1, 4)))
+            + '</ul>'
+            for heading in generator.sample(['Требования:',
+                                             'Обязанности:',
+                                             'Условия:',
+                                             'Мы предлагаем:'], 3))
+        yield {
+            # Some vacancies are duplicated
+            'id': str(number % (amount - 20)),
+            'name': generator.choice(['Python разработчик', 'Аналитик']),
+            'key_skills': [{'name': skill}
+                for skill in generator.sample(skills, 3)],
+            'experience': {'name': generator.choice(['Нет опыта',
+                                                     'От 1 года до 3 лет'])},
+            'specializations': [{'profarea_name': 'Информационные технологии',
+                                 'name': 'Программирование'}],
+            'created_at': f'2020-0{generator.randint(1, 9)}-10T10:00:00+0300',
+            'published_at': f'2020-0{generator.randint(1, 9)}-10T10:00:00+0300',
+            'area': {'name': generator.choice(areas)},
+            'employer': {'id': str(number % 7),
+                         'name': f'Компания {number % 7}',
+                         'alternate_url': f'https://hh.ru/employer/{number % 7}'},
+            'salary': {'from': generator.choice([None, 30000, 60000]),
+                       'to': generator.choice([None, 90000, 120000]),
+                       'currency': 'RUR',
+                       'gross': generator.random() < 0.5},
+            'description': description,
+        }
+
+
+def check_parallel_analysis(workers=3, analyze_chunk=50):
+    '''Analyze fixed vacancies batch in current process and by
+    'workers' processes, returns names of differing results
+    '''
+    default_chunk = VacancyHandler.analyze_chunk
+    VacancyHandler.analyze_chunk = analyze_chunk
+    try:
+        analyzed = []
+        for analysis_workers in (1, workers):
+            vacancies = VacancyHandler('Python')
+            vacancies.analyze_stream(fixed_vacancies(),
+                                     workers=analysis_workers)
+            analyzed.append({result: repr(getattr(vacancies, result))
+                for result in results})
+    finally:
+        VacancyHandler.analyze_chunk = default_chunk
+    return [result
+        for result in results
+            if analyzed[0][result] != analyzed[1][result]]
+
+
+# Checks importing issue
+if __name__ == "__main__":
+    # Parallel analysis gives the same results as serial one
+    differences = check_parallel_analysis()
+    assert not differences, differences
+    print('Parallel analysis results are the same as serial ones')
@@ -0,0 +1,121 @@
+
+# Reports existence check:
+import os
+
+# Freshness time stamps:
+from datetime import datetime, timedelta
+
+# MongoDB stuff:
+from pymongo import ReturnDocument
+
+
+class ReportCache:
+    '''
+    -------------------------------------------------------------
+    Class is designed to reuse stored xlsx reports: report is
+      kept by key of normalized search text, search field and
+      geo areas together with harvest snapshot version it was
+      formed from.
+    Snapshot version is increased by harvest only when stored
+      vacancies are changed, so report of current snapshot is
+      valid while data is the same, and it's fresh while data
+      was harvested less than 'ttl' seconds ago
+    -------------------------------------------------------------
+    Public methods:
+        key(text, search_field, geo_areas)
+        snapshot(key)
+        harvested(key, changed)
+        report(key)
+        fresh(key)
+        put(key, snapshot, report)
+    -------------------------------------------------------------
+    '''
+
+    # Seconds while harvested data (and its report) is fresh
+    ttl = 86400
+
+    def __init__(self, collection, reports_path, ttl=None):
+        # MongoDB reports cache collection
+        self.collection = collection
+        # Directory which reports paths are relative to
+        self.reports_path = reports_path
+        # Freshness of harvested data
+        self.ttl = timedelta(seconds=ReportCache.ttl if ttl is None else ttl)
+
+    @staticmethod
+    def key(text, search_field=None, geo_areas=None):
+        '''Cache key of search: case and spaces of search text
+        and geo areas order don't matter
+        '''
+        text = ' '.join(str(text).lower().split())
+        geo_areas = sorted({str(area) for area in geo_areas or []})
+        return {'_id': '|'.join([text, search_field or '', ','.join(geo_areas)]),
+                'text': text,
+                'search_field': search_field,
+                'geo_areas': geo_areas}
+
+    def snapshot(self, key):
+        '''Current harvest snapshot version of search, 0 if never harvested
+        '''
+        entry = self.collection.find_one({'_id': key['_id']}, {'snapshot': 1})
+        return entry.get('snapshot', 0) if entry else 0
+
+    def harvested(self, key, changed=True):
+        '''Register harvest of search, snapshot version is increased
+        if stored data was 'changed', returns current snapshot version
+        '''
+        search = {field: value
+            for field, value in key.items()
+                if field != '_id'}
+        entry = self.collection.find_one_and_update(
+            {'_id': key['_id']},
+            {'$set': dict(search, harvested_at=datetime.utcnow()),
+             '$inc': {'snapshot': 1 if changed else 0}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER)
+        return entry['snapshot']
+
+    #--------------------------------------------------------------------------
+    # Report path of cache entry if it's formed from current snapshot
+    # and still exists
+    #--------------------------------------------------------------------------
+    def _valid_report(self, entry):
+        if (entry is None or not entry.get('report')
+                or entry.get('report_snapshot') != entry.get('snapshot')):
+            return None
+        if not os.path.isfile(os.path.join(self.reports_path, entry['report'])):
+            return None
+        return entry['report']
+
+    def report(self, key):
+        '''Path (relative to 'reports_path') of report formed
+        from current snapshot, None if there is no such report
+        '''
+        return self._valid_report(self.collection.find_one({'_id': key['_id']}))
+
+    def fresh(self, key):
+        '''Path of report formed from current snapshot harvested
+        less than 'ttl' ago, None if there is no such report
+        '''
+        entry = self.collection.find_one(
+            {'_id': key['_id'],
+             'harvested_at': {'$gte': datetime.utcnow() - self.ttl}})
+        return self._valid_report(entry)
+
+    def put(self, key, snapshot, report):
+        '''Keep 'report' path formed from 'snapshot' version,
+        it's skipped if search was harvested again meanwhile,
+        True if report was kept
+        '''
+        result = self.collection.update_one(
+            {'_id': key['_id'], 'snapshot': snapshot},
+            {'$set': {'report': report,
+                      'report_snapshot': snapshot,
+                      'created': datetime.utcnow()}})
+        return bool(result.matched_count)
+
+
+# Checks importing issue
+if __name__ == "__main__":
+    # Show cache key of test search
+    print(ReportCache.key(' Python  Developer', 'name', ['1202', '1']))
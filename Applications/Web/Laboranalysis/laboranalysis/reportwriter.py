@@ -0,0 +1,123 @@
+
+# Not a number values check:
+import math
+# First row lookahead:
+from itertools import chain
+
+# Xlsx documents writer:
+import xlsxwriter
+# Xlsx documents writer errors:
+from xlsxwriter.exceptions import XlsxWriterException
+
+
+class ReportWriter:
+    '''
+    -------------------------------------------------------------
+    Class is designed to write xlsx report sheet by sheet:
+      rows are streamed straight to worksheets opened in
+      constant memory mode (every row is flushed to disk when
+      next row is written), so neither DataFrames nor whole
+      workbook are kept in memory.
+    Sheets look like pandas ones: bold header row with column
+      names, then data rows
+    -------------------------------------------------------------
+    Public methods:
+        sheet(name, columns, rows, widths)
+        chart(name, columns, amount, type, cell)
+        close()
+    -------------------------------------------------------------
+    '''
+
+    # Colorized stripes of first column
+    stripes = 'A2:A11'
+
+    # Issues of malformed sheet data, sheet could be already added
+    errors = (ValueError, TypeError, XlsxWriterException)
+
+    def __init__(self, path):
+        # Xlsx document itself
+        self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        # Header row format
+        self.header = self.workbook.add_format({'bold': True,
+                                                'border': 1,
+                                                'align': 'center',
+                                                'valign': 'top'})
+        # {sheet name : worksheet}
+        self.sheets = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    #--------------------------------------------------------------------------
+    # Row cells: single value is one cell row, not a number is empty cell
+    #--------------------------------------------------------------------------
+    @staticmethod
+    def _cells(row, width):
+        if isinstance(row, (str, bytes)) or not hasattr(row, '__iter__'):
+            row = (row,)
+        cells = [None if isinstance(cell, float) and math.isnan(cell) else cell
+            for cell in row]
+        if len(cells) != width:
+            raise ValueError(f'{width} columns passed, '
+                             f'row has {len(cells)} columns')
+        return cells
+
+    def sheet(self, name, columns, rows, widths=()):
+        '''Add sheet 'name' with 'columns' header and 'rows'
+        (any iterable of rows or single values), first columns
+        widths are set to 'widths'
+        '''
+        rows = iter(rows if rows is not None else ())
+        # Malformed data is found before sheet is added
+        first = next(rows, None)
+        if first is not None:
+            rows = chain([self._cells(first, len(columns))], rows)
+
+        worksheet = self.sheets[name] = self.workbook.add_worksheet(name)
+        for column, width in enumerate(widths):
+            worksheet.set_column(column, column, width)
+        worksheet.conditional_format(ReportWriter.stripes,
+                                     {'type': '3_color_scale'})
+
+        for column, title in enumerate(columns):
+            worksheet.write(0, column, title, self.header)
+        for number, row in enumerate(rows, 1):
+            for column, cell in enumerate(self._cells(row, len(columns))):
+                if cell is not None:
+                    worksheet.write(number, column, cell)
+        return worksheet
+
+    def chart(self, name, columns, amount, type, cell):
+        '''Insert 'type' chart of sheet 'name' rows from 2 to 'amount'
+        (first column are categories, second one are values) at 'cell'
+        '''
+        chart = self.workbook.add_chart({'type': type})
+        chart.add_series({
+            'categories': f"='{name}'!$A$2:$A${amount}",
+            'values':     f"='{name}'!$B$2:$B${amount}",
+        })
+        # Diagram stylization
+        if type != 'pie':
+            chart.set_x_axis({'name': columns[0],
+                              'num_font':  {'rotation': 45}})
+            chart.set_y_axis({'name': columns[1],
+                              'major_gridlines': {'visible': False}})
+            chart.set_legend({'position': 'none'})
+        self.sheets[name].insert_chart(cell, chart)
+
+    def close(self):
+        '''Write xlsx document
+        '''
+        self.workbook.close()
+
+
+# Checks importing issue
+if __name__ == "__main__":
+    # Write test report
+    with ReportWriter('test.xlsx') as writer:
+        writer.sheet('Тест', ['Слово', 'Вхождений'],
+                     [('python', 3), ('sql', 2)], (25, 20))
+        writer.chart('Тест', ['Слово', 'Вхождений'], '11', 'column', 'D2')
@@ -0,0 +1,121 @@
+
+# MongoDB bulk operations:
+from pymongo import ReplaceOne
+# MongoDB errors:
+from pymongo.errors import OperationFailure
+
+
+class VacancyStorage:
+    '''
+    -------------------------------------------------------------
+    Class is designed to keep vacancies in MongoDB collection
+      with unique index on HH vacancy id: chunked unordered bulk
+      upserts, change stamps lookup and archiving
+    -------------------------------------------------------------
+    Public methods:
+        ensure_indexes()
+        upsert(vacancies)
+        stamps()
+        archive(archived_ids, present_ids)
+        stream(projection, batch_size)
+    -------------------------------------------------------------
+    '''
+
+    # Amount of vacancies in one bulk write
+    chunk_size = 500
+
+    # Amount of vacancies retrieved by cursor per round trip
+    batch_size = 200
+
+    # Collections with already ensured indexes in this process
+    indexed = set()
+
+    def __init__(self, collection, chunk_size=None):
+        # MongoDB collection with vacancies
+        self.collection = collection
+        # Amount of vacancies in one bulk write
+        self.chunk_size = chunk_size or VacancyStorage.chunk_size
+        self.ensure_indexes()
+
+    #--------------------------------------------------------------------------
+    # Drop stored duplicates of vacancies, the last stored one is kept
+    #--------------------------------------------------------------------------
+    def _duplicates_remover(self):
+        duplicates = self.collection.aggregate([
+            {'$group': {'_id': '$id',
+                        'documents': {'$push': '$_id'},
+                        'count': {'$sum': 1}}},
+            {'$match': {'count': {'$gt': 1}}},
+        ], allowDiskUse=True)
+        for duplicate in duplicates:
+            self.collection.delete_many(
+                {'_id': {'$in': duplicate['documents'][:-1]}})
+
+    def ensure_indexes(self):
+        '''Create unique index on vacancy id (once per process)
+        '''
+        name = self.collection.full_name
+        if name in VacancyStorage.indexed:
+            return
+        try:
+            self.collection.create_index('id', unique=True)
+        except OperationFailure:
+            # Collection stored before index creation contains duplicates
+            self._duplicates_remover()
+            self.collection.create_index('id', unique=True)
+        VacancyStorage.indexed.add(name)
+
+    def upsert(self, vacancies):
+        '''Insert new and replace stored vacancies by id
+        in chunked unordered bulk writes,
+        returns {'inserted', 'updated', 'unchanged'} counts
+        '''
+        stats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        for start in range(0, len(vacancies), self.chunk_size):
+            # Replacement can't change MongoDB '_id' of stored vacancy
+            operations = [ReplaceOne({'id': vacancy.get('id')},
+                                     {field: value
+                                         for field, value in vacancy.items()
+                                             if field != '_id'},
+                                     upsert=True)
+                for vacancy in vacancies[start:start + self.chunk_size]]
+            result = self.collection.bulk_write(operations, ordered=False)
+            stats['inserted'] += result.upserted_count
+            stats['updated'] += result.modified_count
+            stats['unchanged'] += result.matched_count - result.modified_count
+        return stats
+
+    def stamps(self):
+        '''{id : change stamp} of stored vacancies,
+        stamp is 'updated_at' or 'published_at'
+        '''
+        return {vacancy.get('id'): (vacancy.get('updated_at')
+                                    or vacancy.get('published_at'))
+            for vacancy in self.collection.find({}, {'_id': 0,
+                                                     'id': 1,
+                                                     'published_at': 1,
+                                                     'updated_at': 1})}
+
+    def archive(self, archived_ids, present_ids):
+        '''Mark vacancies disappeared from search results as archived,
+        returned back to search results as not archived
+        '''
+        if archived_ids:
+            self.collection.update_many({'id': {'$in': list(archived_ids)}},
+                                        {'$set': {'archived': True}})
+        self.collection.update_many({'id': {'$in': list(present_ids)},
+                                     'archived': True},
+                                    {'$set': {'archived': False}})
+
+    def stream(self, projection=None, batch_size=None):
+        '''Generate not archived vacancies one by one,
+        retrieving 'batch_size' vacancies per cursor round trip
+        '''
+        cursor = self.collection.find({'archived': {'$ne': True}},
+                                      projection,
+                                      batch_size=(batch_size
+                                                  or VacancyStorage.batch_size))
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
@@ -13,100 +13,125 @@
 ####   This is SERVER version, intended for deploying to OS environment!   ####
 ###############################################################################
 
-# MongoDB connection stuff:
-from pymongo import MongoClient
-# Our send mail class:
-from mailsender import MailSender
+# Shared MongoDB clients:
+from mongoclients import MongoClients
+# Our background mail outbox:
+from mailoutbox import MailOutbox
+# Concurrent orders processing:
+from orderdispatcher import OrderDispatcher
+# Stored reports reuse:
+from reportcache import ReportCache
 # Our credentials:
-from credentials import mongo, mail_creds
+from credentials import mongo, mail_creds, store_path
+
+# Mail outbox in 'outbox' collection of 'hh_mail' database
+outbox = MailOutbox(MongoClients.get(mongo).hh_mail['outbox'])
+
+# Reports cache in 'cache' collection of 'hh_reports' database
+cache = ReportCache(MongoClients.get(mongo).hh_reports['cache'], store_path)
 
 # Email message subjects
 problem = 'Laboranalysis application ran into an issue'
 success = 'Ваш отчёт готов!'
 
+# Amount of concurrently processed occupations (criteria)
+workers = 2
+
 # This function tries to get an orders from MongoDB
 def get_orders_from_mongo():
-    # Instantiate MongoDB connection context
-    with MongoClient(mongo) as mongodb:
-        # Connection to 'orders' collection of 'hh_reports' database
-        collection = mongodb.hh_reports['orders']
-        # Search for orders
-        orders = [order for order in (collection.find({}))]
-        if orders:
-            for order in orders:
-                # If it's vacancy order
-                if 'occupation' in order.keys():
-                    start_request(order)
-                # If it's resume order
-                else:
-                    start_parse(order)
+    # Shared MongoDB client of this process
+    mongodb = MongoClients.get(mongo)
+    # Connection to 'orders' collection of 'hh_reports' database
+    collection = mongodb.hh_reports['orders']
+    # Search for orders
+    orders = [order for order in (collection.find({}))]
+    if orders:
+        # Orders on the same occupation (criteria) are processed once
+        dispatcher = OrderDispatcher({'occupation': start_request,
+                                      'criteria': start_parse},
+                                     workers)
+        dispatcher.dispatch(orders)
 
 # This function makes vacancies retrievement and analyze process
-def start_request(order):
-    # Try to make processing on geted order
+# for all orders on the same occupation
+def start_request(orders):
+    # Try to make processing on geted orders
     try:
         # Import our vacancy processing class
         from laboranalysis.vacancyhandler import VacancyHandler
-        vacancies = VacancyHandler(order.get('occupation'))
-        vacancies.analyze()
-        vacancies.store_vacancies_to_mongo()
-        vacancies.store_results_to_xlsx()
-        change_order_status(order)
+        vacancies = VacancyHandler(orders[0].get('occupation'))
+        key = vacancies.report_key()
+        # Fresh report of the same search is reused,
+        # harvest and analysis are skipped
+        if not cache.fresh(key):
+            vacancies.analyze()
+            vacancies.store_vacancies_to_mongo()
+            # Full harvest can't tell disappeared vacancies,
+            # so every harvest is new snapshot version
+            snapshot = cache.harvested(key)
+            vacancies.store_results_to_xlsx()
+            # Parquet, CSV and JSON exports of the same results
+            vacancies.export_results()
+            cache.put(key, snapshot, vacancies.report)
+        for order in orders:
+            change_order_status(order)
     # If run into an issue, notificates application admin
     except:
-        mail = MailSender( [mail_creds['admin']], 
-                            problem,
-                            str(order) )
-        mail.send_email()
+        outbox.put( [mail_creds['admin']],
+                     problem,
+                     str(orders) )
     # If completes successfully,
-    # notificates application admin and order customer
-    order_customer = order.get('customer')
-    mail = MailSender( [mail_creds['admin'], order_customer],
-                        success, 
-                        order.get('occupation') )
-    mail.send_email()
+    # notificates application admin and every order customer
+    for order in orders:
+        order_customer = order.get('customer')
+        outbox.put( [mail_creds['admin'], order_customer],
+                     success,
+                     order.get('occupation') )
 
 # This function makes resume retrievement and analyze process
-def start_parse(order):
-    # Try to make processing on geted order
+# for all orders on the same criteria
+def start_parse(orders):
+    # Try to make processing on geted orders
     try:
         # Import our vacancy processing class
         from laboranalysis.resumehandler import ResumeHandler
-        resumes = ResumeHandler(order.get('criteria'))
+        resumes = ResumeHandler(orders[0].get('criteria'))
         resumes.analyze()
         resumes.store_resumes_to_mongo()
         resumes.store_results_to_xlsx()
-        change_order_status(order)
+        for order in orders:
+            change_order_status(order)
     # If run into an issue, notificates application admin
     except:
-        mail = MailSender( [mail_creds['admin']], 
-                            problem, 
-                            str(order) )
-        mail.send_email()        
+        outbox.put( [mail_creds['admin']],
+                     problem,
+                     str(orders) )
     # If completes successfully,
-    # notificates application admin and order customer
-    order_customer = order.get('customer')
-    mail = MailSender( [mail_creds['admin'], order_customer],
-                        success, 
-                        order.get('criteria') )
-    mail.send_email()
+    # notificates application admin and every order customer
+    for order in orders:
+        order_customer = order.get('customer')
+        outbox.put( [mail_creds['admin'], order_customer],
+                     success,
+                     order.get('criteria') )
 
 # This function changes an order status from staging to complete,
 # by moving an order document from 'orders' collection to 'complete' collection
 def change_order_status(order):
-    # Instantiate MongoDB connection context
-    with MongoClient(mongo) as mongodb:
-        # Connection to 'complete' collection of 'hh_reports' database
-        collection = mongodb.hh_reports['complete']
-        # Put completed order
-        collection.insert_one(order)
-        # Connection to 'orders' collection of 'hh_reports' database
-        collection = mongodb.hh_reports['orders']
-        # Drop completed order
-        collection.delete_one(order)
+    # Shared MongoDB client of this process
+    mongodb = MongoClients.get(mongo)
+    # Connection to 'complete' collection of 'hh_reports' database
+    collection = mongodb.hh_reports['complete']
+    # Put completed order
+    collection.insert_one(order)
+    # Connection to 'orders' collection of 'hh_reports' database
+    collection = mongodb.hh_reports['orders']
+    # Drop completed order
+    collection.delete_one(order)
 
 # Checks importing issue
 if __name__ == "__main__":
     # Start work
     get_orders_from_mongo()
+    # Send messages put to outbox by web application and by us
+    outbox.deliver()
     
\ No newline at end of file